@@ -0,0 +1,7 @@
+import sys
+
+from ppc.runner import main
+
+# Same as `python -m ppc --sources features`; any other option of the runner can be passed
+if __name__ == '__main__':
+    main(['--sources', 'features'] + sys.argv[1:])
@@ -0,0 +1 @@
+# Shared stages for the *-ppc.py preprocessing scripts
@@ -0,0 +1,3 @@
+from ppc.runner import main
+
+main()
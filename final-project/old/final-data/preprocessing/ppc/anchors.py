@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from ppc.features import bin_index
+from ppc.geo import DEFAULT_BANDS, haversine_vectorized, bounding_box, band_reach
+from ppc.grid import SpatialGrid
+
+
+# Anchors of a batch run from a CSV with name, latitude and longitude columns,
+# as name -> (lat, lon)
+def read_anchors(file_path):
+    anchors_df = pd.read_csv(file_path)
+    return {str(name): (float(lat), float(lon))
+            for name, lat, lon in anchors_df[['name', 'latitude', 'longitude']].itertuples(index=False)}
+
+
+# Points bucketed by the cells of a grid whose cells are as wide as the query radius,
+# for radius queries around many anchors. Rows are sorted by cell, so the candidates
+# of a query box are one slice of rows per grid row it spans.
+class PointIndex:
+    def __init__(self, lat, lon, grid):
+        self.grid = grid
+        cells = grid.cell_ids(lat, lon)
+        self.order = np.argsort(cells, kind='stable')
+        # Rows outside the grid (cell -1) sort first and are never returned
+        self.offsets = np.searchsorted(cells[self.order], np.arange(grid.n_cells + 1))
+
+    # Rows whose cell overlaps the box (lat_min, lat_max, lon_min, lon_max)
+    def candidates(self, box):
+        grid = self.grid
+        lat_min, lat_max, lon_min, lon_max = box
+        row_min = max(int(np.floor((lat_min - grid.lat_min) / grid.dlat)), 0)
+        row_max = min(int(np.floor((lat_max - grid.lat_min) / grid.dlat)), grid.n_rows - 1)
+        col_min = max(int(np.floor((lon_min - grid.lon_min) / grid.dlon)), 0)
+        col_max = min(int(np.floor((lon_max - grid.lon_min) / grid.dlon)), grid.n_cols - 1)
+        if row_min > row_max or col_min > col_max:
+            return np.empty(0, dtype=np.int64)
+        slices = [self.order[self.offsets[row * grid.n_cols + col_min]:self.offsets[row * grid.n_cols + col_max + 1]]
+                  for row in range(row_min, row_max + 1)]
+        return np.concatenate(slices)
+
+
+# Grid over the boxes of every anchor's reach, with cells as wide as the reach, so
+# each query touches about 3x3 cells
+def anchor_grid(anchors, reach):
+    boxes = np.array([bounding_box(anchor, reach) for anchor in anchors])
+    bbox = (boxes[:, 0].min(), boxes[:, 1].max(), boxes[:, 2].min(), boxes[:, 3].max())
+    return SpatialGrid(bbox, cell_size=max(reach, 1))
+
+
+# Aggregate point events into a long (anchor, band, time_bin) table for many anchors in
+# one pass. `anchors` is a sequence of (lat, lon); anchor and band come back as codes
+# into it and into list(bands). The table holds a `name` column counting the rows
+# (unless name is None) plus one summed column per entry of `weights`.
+#
+# Bounded bands are answered by a grid radius query: only the rows in the cells around
+# an anchor get an exact distance. An unbounded band (min, inf) holds every located
+# row at min meters or more, so it is counted as all rows of the bin minus the rows
+# closer than min, which the same query finds. Bands are expected not to overlap.
+def anchor_counts(lat, lon, timestamps, time_range, anchors, bands=DEFAULT_BANDS, weights=None, name='count'):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    bins = bin_index(timestamps, time_range)
+    rows = np.flatnonzero((bins >= 0) & ~np.isnan(lat) & ~np.isnan(lon))
+    lat, lon, bins = lat[rows], lon[rows], bins[rows]
+
+    columns = {} if name is None else {name: None}
+    for column, values in (weights or {}).items():
+        columns[column] = np.nan_to_num(np.asarray(values, dtype=np.float64)[rows])
+
+    n_bins, n_bands = len(time_range), len(bands)
+    bounded = [(code, low, high) for code, (low, high) in enumerate(bands.values()) if np.isfinite(high)]
+    unbounded = [(code, low) for code, (low, high) in enumerate(bands.values()) if np.isinf(high)]
+    totals = {column: np.bincount(bins, weights=values, minlength=n_bins) for column, values in columns.items()}
+
+    reach = band_reach(bands)
+    index = PointIndex(lat, lon, anchor_grid(anchors, reach))
+
+    keys, sums = [], {column: [] for column in columns}
+    for anchor_code, anchor in enumerate(anchors):
+        candidates = index.candidates(bounding_box(anchor, reach))
+        distances = haversine_vectorized(lat[candidates], lon[candidates], anchor)
+        candidate_bins = bins[candidates]
+
+        # Bounded bands: the first matching band wins
+        codes = np.full(len(candidates), -1, dtype=np.int64)
+        for code, low, high in reversed(bounded):
+            codes[(distances >= low) & (distances <= high)] = code
+        in_band = codes >= 0
+        band_keys = (anchor_code * n_bands + codes[in_band]) * n_bins + candidate_bins[in_band]
+        unique_keys, inverse = np.unique(band_keys, return_inverse=True)
+        keys.append(unique_keys)
+        for column, values in columns.items():
+            band_values = None if values is None else values[candidates][in_band]
+            sums[column].append(np.bincount(inverse, weights=band_values, minlength=len(unique_keys)))
+
+        # Unbounded bands: everything in the bin but the rows closer than the band
+        for code, low in unbounded:
+            near = distances < low
+            near_totals = {column: np.bincount(candidate_bins[near], minlength=n_bins,
+                                               weights=None if values is None else values[candidates][near])
+                           for column, values in columns.items()}
+            outside = {column: totals[column] - near_totals[column] for column in columns}
+            nonzero = np.flatnonzero(np.any([outside[column] != 0 for column in columns], axis=0))
+            keys.append((anchor_code * n_bands + code) * n_bins + nonzero)
+            for column in columns:
+                sums[column].append(outside[column][nonzero])
+
+    keys = np.concatenate(keys)
+    anchor_band, time_bin = np.divmod(keys, n_bins)
+    anchor_code, band_code = np.divmod(anchor_band, n_bands)
+    table = pd.DataFrame({
+        'anchor': anchor_code.astype(np.int32),
+        'band': band_code.astype(np.int8),
+        'time_bin': time_range[time_bin],
+    })
+    for column in columns:
+        table[column] = np.rint(np.concatenate(sums[column])).astype(np.int64)
+    return table
+
+
+# Merge (anchor, band, time_bin) tables built from separate chunks or partitions
+def merge_anchor_counts(tables):
+    counts_df = pd.concat(tables, ignore_index=True)
+    return counts_df.groupby(['anchor', 'band', 'time_bin'], as_index=False).sum()
+
+
+# Take the counts of `removed_df` off `counts_df`, dropping the keys left without any
+def subtract_anchor_counts(counts_df, removed_df):
+    values = [column for column in removed_df.columns if column not in ('anchor', 'band', 'time_bin')]
+    removed_df = removed_df.assign(**{column: -removed_df[column] for column in values})
+    counts_df = merge_anchor_counts([counts_df, removed_df])
+    return counts_df[(counts_df[values] != 0).any(axis=1)].reset_index(drop=True)
+
+
+# Replace the anchor and band codes by their names, as categoricals, and name the
+# time column
+def label_anchor_counts(counts_df, anchor_names, bands, time_column='time_bin'):
+    counts_df = counts_df.sort_values(['anchor', 'band', 'time_bin'], ignore_index=True)
+    counts_df['anchor'] = pd.Categorical.from_codes(counts_df['anchor'], categories=list(anchor_names))
+    counts_df['band'] = pd.Categorical.from_codes(counts_df['band'], categories=list(bands))
+    return counts_df.rename(columns={'time_bin': time_column})
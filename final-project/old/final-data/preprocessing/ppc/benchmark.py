@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ppc.instrument import records, clear, reset_peak_rss
+from ppc.output import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from ppc.runner import SOURCES
+from ppc.sources import RunConfig
+from ppc.synthetic import GENERATOR_VERSION, generate_inputs
+
+# Slowdown over the baseline reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+# Stages faster than this (in seconds) are never reported as a regression, as their
+# times are mostly noise
+MIN_STAGE_TIME = 0.1
+
+
+# Run one source end to end and return its stages as recorded by ppc.instrument, so
+# the timings are those of the code the pipeline runs. Stages are named by their path
+# under the source (e.g. 'read/parse'), the source stage itself is 'end to end', and
+# the partitions of a stage (e.g. the taxi months) are added up.
+def bench_source(name, config):
+    clear()
+    reset_peak_rss()
+    SOURCES[name].run(config)
+
+    stage_records = []
+    for record in records():
+        stage = 'end to end' if record['stage'] == name else record['stage'][len(name) + 1:]
+        stage_records.append({**record, 'source': name, 'stage': stage})
+    stages_df = pd.DataFrame(stage_records).groupby(['source', 'stage'], sort=False).agg(
+        calls=('calls', 'sum'), rows_in=('rows_in', lambda rows: rows.sum(min_count=1)),
+        rows=('rows_out', lambda rows: rows.sum(min_count=1)), wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'),
+        peak_rss_mb=('peak_rss_mb', 'max'))
+    stages_df = stages_df.reset_index().astype({'rows_in': 'Int64', 'rows': 'Int64'}).astype(object)
+    return stages_df.where(stages_df.notna(), None).to_dict('records')
+
+
+# Run one benchmark case in a fresh process, so neither the peak RSS nor warm
+# caches of one source leak into the next
+def run_case(name, config):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(bench_source, name, config).result()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Fields identifying a run, stored with every record so results of different
+# commits at the same scale can be matched up
+def run_info(rows, seed, config):
+    return {
+        'commit': git_commit(),
+        'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'rows_scale': rows,
+        'seed': seed,
+        'freq': config.freq,
+        'output_format': config.output_format,
+        'workers': config.workers,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+    }
+
+
+# Per-stage comparison against a previous results file at the same scale, using the
+# best time of each stage on both sides. Stages under `min_time` seconds are not
+# reported as regressions.
+def compare(results_df, baseline_df, threshold=REGRESSION_THRESHOLD, min_time=MIN_STAGE_TIME):
+    keys = ['source', 'stage']
+    baseline_df = baseline_df[baseline_df['rows_scale'] == results_df['rows_scale'].iloc[0]]
+    baseline_df = baseline_df[baseline_df['run_id'] == baseline_df['run_id'].max()]
+    current = results_df.groupby(keys, sort=False)[['wall_s', 'peak_rss_mb']].min()
+    baseline = baseline_df.groupby(keys)[['wall_s', 'peak_rss_mb']].min()
+    comparison_df = current.join(baseline, rsuffix='_baseline', how='inner')
+    comparison_df['speedup'] = comparison_df['wall_s_baseline'] / comparison_df['wall_s']
+    comparison_df['regression'] = ((comparison_df['wall_s'] > comparison_df['wall_s_baseline'] * threshold) &
+                                   (comparison_df['wall_s'] >= min_time))
+    return comparison_df.reset_index()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every preprocessing stage on synthetic inputs')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='taxi trips to generate; the other inputs are scaled from it')
+    parser.add_argument('--work-dir', default='ppc-benchmark', help='directory of the generated inputs and the outputs')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES), help='sources to benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic inputs')
+    parser.add_argument('--repeat', type=int, default=1, help='times to run every case; the comparison uses the best')
+    parser.add_argument('--freq', default='15min', help='width of the time bins')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, help='file format of the outputs')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes of the source runs')
+    parser.add_argument('--results', default='benchmark-results.jsonl', help='file the records are appended to')
+    parser.add_argument('--compare', help='results file of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='slowdown over the baseline reported as a regression')
+    parser.add_argument('--min-time', type=float, default=MIN_STAGE_TIME, help='seconds under which a stage is never reported as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Inputs are generated once per scale and seed and reused by later runs
+    data_dir = os.path.join(args.work_dir, f'data-{args.rows}-{args.seed}-v{GENERATOR_VERSION}')
+    marker = os.path.join(data_dir, 'generated.json')
+    if not os.path.exists(marker):
+        print(f"Generating inputs for {args.rows:,} rows in {data_dir}")
+        scaled = generate_inputs(data_dir, args.rows, seed=args.seed)
+        with open(marker, 'w') as file:
+            json.dump(scaled, file)
+
+    # Every run starts without a cache, so repeated runs time the same work
+    config = RunConfig(data_dir=data_dir, output_dir=os.path.join(args.work_dir, f'out-{args.rows}-{args.seed}'), freq=args.freq,
+                       output_format=args.output_format, workers=args.workers, cache=False)
+    os.makedirs(config.output_dir, exist_ok=True)
+
+    # Primary sources first, the derived ones read their outputs
+    names = [name for name in args.sources if not SOURCES[name].derived] + [name for name in args.sources if SOURCES[name].derived]
+    info = run_info(args.rows, args.seed, config)
+    run_id = time.time_ns()
+    results = []
+    for repeat in range(args.repeat):
+        for name in names:
+            for record in run_case(name, config):
+                results.append({'run_id': run_id, 'repeat': repeat, **record, **info})
+
+    results_df = pd.DataFrame(results).astype({'rows_in': 'Int64', 'rows': 'Int64'})
+    with open(args.results, 'a') as file:
+        for record in results:
+            file.write(json.dumps(record) + '\n')
+
+    summary_df = results_df.groupby(['source', 'stage'], sort=False).agg(
+        rows=('rows', 'first'), wall_s=('wall_s', 'min'), cpu_s=('cpu_s', 'min'), peak_rss_mb=('peak_rss_mb', 'max'))
+    print(summary_df.round(3).to_string())
+    print(f"Results appended to {args.results}")
+
+    if args.compare:
+        comparison_df = compare(results_df, pd.read_json(args.compare, lines=True), args.threshold, args.min_time)
+        if comparison_df.empty:
+            print(f"No baseline records at {args.rows:,} rows in {args.compare}")
+        else:
+            print(comparison_df.round(3).to_string(index=False))
+        if comparison_df['regression'].any():
+            print(f"Stages slower than {args.threshold:.0%} of the baseline time")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import glob
+import json
+import hashlib
+import functools
+import pandas as pd
+
+from ppc.parallel import map_partitions
+
+
+# Bytes hashed at a time when fingerprinting a file
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Directory of the modules whose source keys the cached results
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Short stable digest of bytes or of the repr of any value
+def digest(value):
+    if not isinstance(value, bytes):
+        value = repr(value).encode()
+    return hashlib.blake2b(value, digest_size=16).hexdigest()
+
+
+# Digest of the source of every module of the ppc package. Every cached result is
+# keyed by it, so editing any code that may have produced it (a parser, a filter, a
+# zone lookup, a class attribute such as a date format) invalidates them.
+@functools.lru_cache(maxsize=None)
+def package_digest():
+    package_hash = hashlib.blake2b(digest_size=16)
+    for file_path in sorted(glob.glob(os.path.join(PACKAGE_DIR, '*.py'))):
+        with open(file_path, 'rb') as f:
+            package_hash.update(os.path.basename(file_path).encode() + b'\0' + f.read())
+    return package_hash.hexdigest()
+
+
+# Content hash of a file. Hashes are remembered in `cache_dir` by path, size and
+# modification time, so unchanged inputs are not re-read on the next run.
+def file_fingerprint(file_path, cache_dir):
+    stat = os.stat(file_path)
+    memo_key = f'{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    memo_file = os.path.join(cache_dir, 'fingerprints.json')
+
+    memo = {}
+    if os.path.exists(memo_file):
+        with open(memo_file) as f:
+            memo = json.load(f)
+    if memo_key in memo:
+        return memo[memo_key]
+
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+    memo[memo_key] = file_hash.hexdigest()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(memo_file, 'w') as f:
+        json.dump(memo, f)
+    return memo[memo_key]
+
+
+# On-disk cache of per-partition intermediate results (filtered chunks, monthly
+# counts, ...) for one dataset. Entries are keyed by the partition key (e.g. the
+# source file hash) plus `params` (anchor, radii, window, bin width) and the
+# package source, so a rerun only recomputes partitions whose input, parameters or
+# code changed.
+class PartitionCache:
+    def __init__(self, cache_dir, name, params):
+        self.cache_dir = cache_dir
+        self.dir = os.path.join(cache_dir, name)
+        self.params_key = digest((package_digest(), sorted(params.items())))
+        self.used = set()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, partition_key):
+        return os.path.join(self.dir, f'{self.params_key}-{digest(partition_key)}.pkl')
+
+    def contains(self, partition_key):
+        return os.path.exists(self._path(partition_key))
+
+    def get(self, partition_key):
+        path = self._path(partition_key)
+        self.used.add(path)
+        return pd.read_pickle(path)
+
+    def put(self, partition_key, result):
+        path = self._path(partition_key)
+        self.used.add(path)
+        # Write to a temporary file first so an interrupted run never leaves a partial entry
+        pd.to_pickle(result, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def get_or_compute(self, partition_key, compute):
+        if self.contains(partition_key):
+            return self.get(partition_key)
+        result = compute()
+        self.put(partition_key, result)
+        return result
+
+    # Like map_partitions, but only the items whose key is not cached yet are computed
+    def map(self, func, items, keys, workers=None, args=()):
+        items, keys = list(items), list(keys)
+        missing = [(item, key) for item, key in zip(items, keys) if not self.contains(key)]
+        computed = map_partitions(func, [item for item, _ in missing], workers, args)
+        for (_, key), result in zip(missing, computed):
+            self.put(key, result)
+        return [self.get(key) for key in keys]
+
+    # Remove entries with the same parameters that were not read or written through
+    # this cache instance, e.g. the partitions of a file that has since been appended to
+    def prune(self):
+        for file_name in os.listdir(self.dir):
+            path = os.path.join(self.dir, file_name)
+            if file_name.startswith(self.params_key) and path not in self.used:
+                os.remove(path)
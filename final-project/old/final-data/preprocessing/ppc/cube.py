@@ -0,0 +1,175 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ppc.dtypes import compact_counts, output_counts
+from ppc.features import bin_index
+from ppc.output import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT, write_frame
+
+# Finest bins the counts are materialized at; every coarser resolution is rolled up
+# from them
+CUBE_FREQ = '5min'
+
+# Calendar fields a cube can be profiled by, and the number of values of each
+CALENDAR_FIELDS = {
+    'dayofweek': 7,
+    'hour': 24,
+    'minute': 60,
+}
+
+
+# Index of every bin of the regular timeline `time_range` in the coarser timeline of
+# `freq` bins starting at the same time, and that timeline. It is plain integer
+# division of the bin positions, as `freq` must be a multiple of the bin width.
+def rollup_index(time_range, freq):
+    fine_step = pd.Timedelta(time_range.freq).value
+    coarse_step = pd.Timedelta(freq).value
+    if coarse_step % fine_step:
+        raise ValueError(f"Cannot roll {time_range.freqstr} bins up to {freq}: it must be a multiple of the bin width")
+
+    ratio = coarse_step // fine_step
+    index = np.arange(len(time_range), dtype=np.int64) // ratio
+    coarse_range = pd.date_range(time_range[0], periods=-(-len(time_range) // ratio), freq=freq)
+    return index, coarse_range
+
+
+# Counts per radius band and time bin of one dataset, one (bands, bins) array per
+# column. It is filled once at the finest resolution of the run, and any coarser
+# timeline or calendar profile is summed from it without going back to the raw rows.
+class CountCube:
+    def __init__(self, time_range, bands, time_prefix='time', sparse=False):
+        self.time_range = time_range
+        self.bands = list(bands)
+        # Name of the time column of the frames, suffixed with the bin width
+        self.time_prefix = time_prefix
+        # Whether the frames keep only the bins holding a count (see to_frame), like
+        # the taxi outputs
+        self.sparse = sparse
+        self.columns = {}
+
+    # Number of time bins
+    def __len__(self):
+        return len(self.time_range)
+
+    # Sum of `weights` (or number of rows) per band and bin. `codes` index into the
+    # bands, -1 for rows in no band; a single code applies to every row.
+    def add_counts(self, name, codes, timestamps, weights=None):
+        bins = bin_index(timestamps, self.time_range)
+        codes = np.broadcast_to(np.asarray(codes, dtype=np.int64), bins.shape)
+        keep = (codes >= 0) & (bins >= 0)
+        keys = codes[keep] * len(self.time_range) + bins[keep]
+        if weights is not None:
+            weights = np.nan_to_num(np.asarray(weights, dtype=np.float64)[keep])
+        sums = np.bincount(keys, weights=weights, minlength=len(self.bands) * len(self.time_range))
+        sums = np.rint(sums).astype(np.int64) if weights is not None else sums
+        self.columns[name] = self.columns.get(name, 0) + sums.reshape(len(self.bands), len(self.time_range))
+
+    # Cube of the coarser `freq` bins, each the sum of the bins it covers
+    def rollup(self, freq):
+        index, coarse_range = rollup_index(self.time_range, freq)
+        cube = CountCube(coarse_range, self.bands, self.time_prefix, self.sparse)
+        if len(self.time_range) == 0:
+            return cube
+        # The bins of one coarse bin are a run of consecutive fine bins
+        starts = np.flatnonzero(np.diff(index, prepend=-1))
+        for name, values in self.columns.items():
+            cube.columns[name] = np.add.reduceat(values, starts, axis=1)
+        return cube
+
+    # Totals per band and combination of the calendar `fields` (see CALENDAR_FIELDS)
+    # over the whole timeline, e.g. ['dayofweek', 'hour'] for the weekly profile
+    def calendar(self, fields):
+        sizes = [CALENDAR_FIELDS[field] for field in fields]
+        keys = np.ravel_multi_index([getattr(self.time_range, field).to_numpy() for field in fields], sizes)
+        n_keys = int(np.prod(sizes))
+
+        profile_df = pd.DataFrame({'band': pd.Categorical.from_codes(np.repeat(np.arange(len(self.bands)), n_keys), categories=self.bands)})
+        for field, values in zip(fields, np.unravel_index(np.tile(np.arange(n_keys), len(self.bands)), sizes)):
+            profile_df[field] = values.astype(np.int8)
+        for name, values in self.columns.items():
+            totals = np.zeros((len(self.bands), n_keys), dtype=np.int64)
+            np.add.at(totals, (slice(None), keys), values)
+            profile_df[name] = compact_counts(totals.ravel())
+        return profile_df
+
+    # Timeline of one band with a column per count. With `sparse` (by default the
+    # cube's), only the bins holding a non-zero count are kept.
+    def to_frame(self, band, time_column=None, sparse=None):
+        code = self.bands.index(band)
+        sparse = self.sparse if sparse is None else sparse
+        keep = slice(None)
+        if sparse:
+            keep = np.flatnonzero(np.any([values[code] != 0 for values in self.columns.values()], axis=0))
+        frame = pd.DataFrame({time_column or f'{self.time_prefix}_{self.time_range.freqstr}': self.time_range[keep]})
+        for name, values in self.columns.items():
+            frame[name] = compact_counts(values[code][keep])
+        return frame
+
+    # Save to `path` + '.npz' and return the file path. The timeline is stored as its
+    # start and step, the counts as ppc.dtypes.OUTPUT_COUNT_DTYPE.
+    def save(self, path):
+        output_file = path + '.npz'
+        arrays = {f'column:{name}': output_counts(values) for name, values in self.columns.items()}
+        np.savez(output_file, start=np.int64(self.time_range[0].value), step=np.int64(pd.Timedelta(self.time_range.freq).value),
+                 n_bins=np.int64(len(self.time_range)), bands=np.array(self.bands), time_prefix=np.array(self.time_prefix),
+                 sparse=np.bool_(self.sparse), **arrays)
+        return output_file
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path if path.endswith('.npz') else path + '.npz') as store:
+            time_range = pd.date_range(pd.Timestamp(int(store['start'])), periods=int(store['n_bins']),
+                                       freq=pd.Timedelta(int(store['step'])))
+            # Cubes saved before the flag was stored are dense
+            sparse = 'sparse' in store.files and bool(store['sparse'])
+            cube = cls(time_range, store['bands'].tolist(), str(store['time_prefix']), sparse)
+            for key in store.files:
+                if key.startswith('column:'):
+                    cube.columns[key.split(':', 1)[1]] = store[key].astype(np.int64)
+        return cube
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Roll saved count cubes up to a coarser resolution without re-reading the raw data')
+    parser.add_argument('cubes', nargs='+', help='*_cube.npz files written by a pipeline run')
+    rollup = parser.add_mutually_exclusive_group(required=True)
+    rollup.add_argument('--freq', help='width of the coarser time bins, e.g. 15min, 1h or 1D')
+    rollup.add_argument('--calendar', nargs='+', choices=list(CALENDAR_FIELDS), help='profile over calendar fields, e.g. dayofweek hour')
+    parser.add_argument('--output-dir', default='.', help='directory the rollups are written to')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, help='file format of the rollups')
+    return parser.parse_args(argv)
+
+
+# One file per band for a --freq rollup, e.g. crashes_sums_1000m_1h, dense or sparse
+# like the outputs of the run that saved the cube, or one file for all bands for a
+# --calendar profile, e.g. crashes_sums_by_dayofweek_hour
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_files = []
+    for cube_file in args.cubes:
+        cube = CountCube.load(cube_file)
+        stem = os.path.basename(cube_file).rsplit('.', 1)[0]
+        stem = stem[:-len('_cube')] if stem.endswith('_cube') else stem
+        if args.calendar:
+            output_path = os.path.join(args.output_dir, f"{stem}_by_{'_'.join(args.calendar)}")
+            output_files.append(write_frame(cube.calendar(args.calendar), output_path, args.output_format))
+            continue
+        try:
+            rolled = cube.rollup(args.freq)
+        except ValueError as error:
+            # e.g. the day bins of the arrests cannot give hourly counts
+            print(f"Skipped {cube_file}: {error}")
+            continue
+        for band in rolled.bands:
+            output_path = os.path.join(args.output_dir, f'{stem}_{band}_{args.freq}')
+            # Named like the pipeline's time columns, e.g. crash_time_1h
+            time_column = f'{rolled.time_prefix}_{args.freq}'
+            output_files.append(write_frame(rolled.to_frame(band, time_column), output_path, args.output_format))
+    print("Files saved:\n" + "\n".join(output_files))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,571 @@
+import os
+import glob
+from functools import partial
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ppc.cache import file_fingerprint
+from ppc.cube import CountCube
+from ppc.dtypes import COORDINATE_DTYPE, CODE_DTYPE, ROW_COUNT_DTYPE, compact_counts
+from ppc.anchors import anchor_counts, label_anchor_counts
+from ppc.features import FeatureMatrix, timeline, bin_index
+from ppc.grid import SpatialGrid, cell_counts, merge_cell_counts
+from ppc.ingest import read_parquet_filtered, iter_parquet_batches, window_filters
+from ppc.instrument import stage
+from ppc.intervals import interval_counts
+from ppc.output import read_frame
+from ppc.parallel import map_partitions
+from ppc.sources import Source, PointSource, SOURCES, register_source
+from ppc.zones import zone_table, zone_bands, known_zones, band_zone_ids, lookup
+
+
+# Band code (into list(bands)) of every row from its 'distance_band' label
+def distance_band_codes(df, bands):
+    return pd.Categorical(df['distance_band'], categories=list(bands)).codes
+
+
+# NYPD arrests, counted per day and law category (Felony / Misdemeanor)
+@register_source
+class ArrestsSource(PointSource):
+    name = 'arrests'
+    path = "unprocessed-data/NYPD_Arrests_Data.csv"
+    columns = {
+        "ARREST_KEY": "arrest_key",
+        "ARREST_DATE": "arrest_date",
+        "LAW_CAT_CD": "law_category",
+        "Latitude": "latitude",
+        "Longitude": "longitude"
+    }
+    dtypes = {"ARREST_KEY": str, "ARREST_DATE": str, "LAW_CAT_CD": CODE_DTYPE, "Latitude": COORDINATE_DTYPE, "Longitude": COORDINATE_DTYPE}
+    date_column = 'arrest_date'
+    timestamp_column = 'arrest_date'
+    id_columns = ['arrest_key']
+    anchor_stem = 'arrests_F_and_M_by_anchor'
+    anchor_count_column = 'total_arrests'
+
+    # Take only Felony and Misdemeanor
+    def filter_rows(self, chunk):
+        return chunk[chunk["law_category"].isin(['F', 'M'])]
+
+    def anchor_weights(self, chunk):
+        return {
+            'felony_count': chunk['law_category'] == 'F',
+            'misdemeanor_count': chunk['law_category'] == 'M',
+        }
+
+    # Arrests are only dated, so they are always counted per day
+    def anchor_timeline(self, config):
+        return timeline(config.start, config.end, '1D'), 'arrest_date'
+
+    def aggregate(self, arrests_df, config):
+        arrests_df = arrests_df.sort_values(by='arrest_date')
+
+        # Arrests are only dated, so their cube has day bins and they are always
+        # counted per day
+        cube = CountCube(timeline(config.start, config.end, '1D'), config.bands, time_prefix='arrest_date')
+        codes = distance_band_codes(arrests_df, config.bands)
+        cube.add_counts('felony_count', np.where(arrests_df['law_category'] == 'F', codes, -1), arrests_df['arrest_date'])
+        cube.add_counts('misdemeanor_count', np.where(arrests_df['law_category'] == 'M', codes, -1), arrests_df['arrest_date'])
+
+        # Calculate the total number of arrests for each day
+        cube.add_counts('total_arrests', codes, arrests_df['arrest_date'])
+
+        outputs = {'arrests_F_and_M_cube': cube}
+        for band in config.bands:
+            outputs[f'arrests_F_and_M_{band}'] = cube.to_frame(band, 'arrest_date')
+        outputs['arrests_F_and_M_raw'] = arrests_df
+        return outputs
+
+
+# NYPD shooting incidents, counted per time bin
+@register_source
+class ShootingsSource(PointSource):
+    name = 'shootings'
+    path = "unprocessed-data/NYPD_Shooting_Incident_Data.csv"
+    columns = {
+        "OCCUR_DATE": "occur_date",
+        "OCCUR_TIME": "occur_time",
+        "STATISTICAL_MURDER_FLAG": "statistical_murder",
+        "Latitude": "latitude",
+        "Longitude": "longitude"
+    }
+    dtypes = {"OCCUR_DATE": str, "OCCUR_TIME": str, "STATISTICAL_MURDER_FLAG": "bool",
+              "Latitude": COORDINATE_DTYPE, "Longitude": COORDINATE_DTYPE}
+    date_column = 'occur_date'
+    time_column = 'occur_time'
+    timestamp_column = 'occur_datetime'
+    # INCIDENT_KEY is shared by the rows of the victims of one incident, so it does
+    # not identify a row and the shootings are not deduplicated
+    id_columns = None
+    anchor_stem = 'shootings_by_anchor'
+    bin_prefix = 'shooting_time'
+    anchor_count_column = 'shooting_count'
+
+    def aggregate(self, shootings_df, config):
+        shootings_df = shootings_df.sort_values(by='occur_datetime')
+
+        # Round every shooting down to the start of its time bin
+        bin_column = f'shooting_time_{config.freq}'
+        shootings_df[bin_column] = shootings_df['occur_datetime'].dt.floor(config.freq)
+        shootings_df = shootings_df[["occur_datetime", bin_column, "statistical_murder", "latitude", "longitude", "distance_band"]]
+
+        # Counted in the cube bins, then rolled up to the output bins
+        cube = CountCube(timeline(config.start, config.end, config.cube_freq), config.bands, time_prefix='shooting_time')
+        cube.add_counts('murder_count', distance_band_codes(shootings_df, config.bands), shootings_df['occur_datetime'])
+        rolled = cube.rollup(config.freq)
+
+        outputs = {'shootings_raw': shootings_df, 'shootings_cube': cube}
+        for band in config.bands:
+            counts_df = rolled.to_frame(band, bin_column)
+
+            # Whether any shooting happened in the bin
+            boolean_df = counts_df[[bin_column]].copy()
+            boolean_df['was_shooting'] = counts_df['murder_count'] > 0
+
+            outputs[f'shootings_{band}_boolean'] = boolean_df
+            outputs[f'shootings_{band}'] = counts_df
+        return outputs
+
+
+# The "NUMBER OF ..." casualty columns of the collisions export
+NUMBER_OF_COLS = {
+    "NUMBER OF PERSONS INJURED": "number_of_persons_injured",
+    "NUMBER OF PERSONS KILLED": "number_of_persons_killed",
+    "NUMBER OF PEDESTRIANS INJURED": "number_of_pedestrians_injured",
+    "NUMBER OF PEDESTRIANS KILLED": "number_of_pedestrians_killed",
+    "NUMBER OF CYCLIST INJURED": "number_of_cyclist_injured",
+    "NUMBER OF CYCLIST KILLED": "number_of_cyclist_killed",
+    "NUMBER OF MOTORIST INJURED": "number_of_motorist_injured",
+    "NUMBER OF MOTORIST KILLED": "number_of_motorist_killed"
+}
+
+
+# Motor vehicle collisions, with the injured and killed summed per time bin
+@register_source
+class CrashesSource(PointSource):
+    name = 'crashes'
+    path = "unprocessed-data/Motor_Vehicle_Collisions_Crashes_Data.csv"
+    columns = {
+        "COLLISION_ID": "collision_id",
+        "CRASH DATE": "crash_date",
+        "CRASH TIME": "crash_time",
+        "LATITUDE": "latitude",
+        "LONGITUDE": "longitude",
+        **NUMBER_OF_COLS
+    }
+    dtypes = {
+        "COLLISION_ID": str,
+        "CRASH DATE": str,
+        "CRASH TIME": str,
+        "LATITUDE": COORDINATE_DTYPE,
+        "LONGITUDE": COORDINATE_DTYPE,
+        **{col: ROW_COUNT_DTYPE for col in NUMBER_OF_COLS}
+    }
+    date_column = 'crash_date'
+    time_column = 'crash_time'
+    timestamp_column = 'crash_datetime'
+    id_columns = ['collision_id']
+    anchor_stem = 'crashes_sums_by_anchor'
+    bin_prefix = 'crash_time'
+    anchor_count_column = 'number_of_crashes'
+
+    def anchor_weights(self, chunk):
+        return {column: chunk[column] for column in ['number_of_persons_injured', 'number_of_persons_killed']}
+
+    def aggregate(self, collisions, config):
+        collisions = collisions.sort_values(by='crash_datetime')
+
+        # Round every crash down to the start of its time bin
+        bin_column = f'crash_time_{config.freq}'
+        collisions[bin_column] = collisions['crash_datetime'].dt.floor(config.freq)
+        collisions = collisions[["crash_datetime", bin_column, "latitude", "longitude", "number_of_persons_injured", "number_of_persons_killed", "distance_band"]]
+
+        # Sum the total number of injured and killed and count the crashes of every cube
+        # bin, then roll them up to the output bins
+        cube = CountCube(timeline(config.start, config.end, config.cube_freq), config.bands, time_prefix='crash_time')
+        codes = distance_band_codes(collisions, config.bands)
+        cube.add_counts('number_of_persons_injured', codes, collisions['crash_datetime'], collisions['number_of_persons_injured'])
+        cube.add_counts('number_of_persons_killed', codes, collisions['crash_datetime'], collisions['number_of_persons_killed'])
+        cube.add_counts('number_of_crashes', codes, collisions['crash_datetime'])
+        rolled = cube.rollup(config.freq)
+
+        outputs = {'crashes_sums_cube': cube}
+        for band in config.bands:
+            outputs[f'crashes_sums_{band}'] = rolled.to_frame(band, bin_column)
+
+        outputs['crashes_raw'] = collisions
+        return outputs
+
+
+# Permitted events, counted while active in each time bin
+@register_source
+class EventsSource(Source):
+    name = 'events'
+    path = "unprocessed-data/NYC_Permitted_Event_Information_Data.csv"
+
+    columns = ['Start Date/Time', 'End Date/Time', 'Event Type', 'Event Borough']
+    dtypes = {'Event Type': CODE_DTYPE, 'Event Borough': CODE_DTYPE}
+
+    def read(self, config):
+        events_df = pd.read_csv(config.data_path(self.path), usecols=self.columns, dtype=self.dtypes)
+
+        # Convert 'Start Date/Time' and 'End Date/Time' to datetime
+        events_df['Start Date/Time'] = pd.to_datetime(events_df['Start Date/Time'])
+        events_df['End Date/Time'] = pd.to_datetime(events_df['End Date/Time'])
+
+        # Filter events to only include those starting before the end of the window
+        events_df = events_df[events_df['Start Date/Time'] < config.end]
+        return events_df.sort_values(by='Start Date/Time')
+
+    def aggregate(self, events_df, config):
+        # The timeline of the window shared by the other outputs and the features
+        time_range = timeline(config.start, config.end, config.freq)
+
+        # Count the events active in each bin, in total, per borough and per event type
+        outputs = {}
+        for stem, by in [('nyc_event_counts', None),
+                         ('nyc_event_counts_by_borough', 'Event Borough'),
+                         ('nyc_event_counts_by_type', 'Event Type')]:
+            counts_df = interval_counts(events_df, 'Start Date/Time', 'End Date/Time', time_range, by=by)
+            outputs[stem] = counts_df.rename_axis('time_interval').reset_index()
+        return outputs
+
+
+# US federal holidays of the years in the window
+@register_source
+class HolidaysSource(Source):
+    name = 'holidays'
+    path = "unprocessed-data/US Federal Pay and Leave Holidays 2004 to 2100.csv"
+
+    # Output file stem, e.g. US_2014_federal_holidays
+    def output_stem(self, config):
+        first_year, last_year = config.start.year, (config.end - pd.Timedelta(1)).year
+        years = str(first_year) if first_year == last_year else f'{first_year}-{last_year}'
+        return f'US_{years}_federal_holidays'
+
+    def read(self, config):
+        us_federal_holidays = pd.read_csv(config.data_path(self.path))
+        years = range(config.start.year, (config.end - pd.Timedelta(1)).year + 1)
+        return us_federal_holidays[us_federal_holidays["Year"].isin(years)]
+
+    def aggregate(self, holidays_df, config):
+        holidays_df = holidays_df[["Title", "Date", "Year", "Month", "Day"]].copy()
+
+        # Convert specific columns to desired types
+        holidays_df['Title'] = holidays_df['Title'].astype(str)
+        holidays_df['Date'] = pd.to_datetime(holidays_df['Date'])
+        holidays_df[['Year', 'Month', 'Day']] = holidays_df[['Year', 'Month', 'Day']].astype(int)
+        return {self.output_stem(config): holidays_df}
+
+
+# Count one monthly taxi file's pickups per cube bin and band, recorded as a 'month'
+# stage labelled with the month of the file
+def count_taxi_month(file_path, zones, config):
+    month = os.path.basename(file_path).rsplit('.', 1)[0].rsplit('_', 1)[-1]
+    with stage('month', partition=month) as month_record:
+        # Load only the required columns, skipping row groups outside the date window
+        # or without a pickup zone in any band
+        with stage('load') as record:
+            filters = window_filters('tpep_pickup_datetime', config.start, config.end) + [('PULocationID', 'in', band_zone_ids(zones))]
+            df = read_parquet_filtered(file_path, ["tpep_pickup_datetime", "PULocationID", "DOLocationID"], filters)
+            record['rows_out'] = month_record['rows_in'] = len(df)
+
+        with stage('geo filter', rows_in=len(df)) as record:
+            # Skip trips whose pickup or drop-off zone has no centroid
+            known = known_zones(zones, df['PULocationID']) & known_zones(zones, df['DOLocationID'])
+
+            # Look up the distance band of every pickup zone in the precomputed zone table
+            pickup_band = zone_bands(zones, df['PULocationID'], config.bands)
+            record['rows_out'] = int((known & pickup_band.notna()).sum())
+
+        # Group by the time bins and count the number of pickups
+        with stage('bin', rows_in=record['rows_out']) as record:
+            bin_column = f'pickup_time_{config.cube_freq}'
+            counts = {}
+            for band in config.bands:
+                band_df = df[known & (pickup_band == band)]
+                pickup_bins = band_df['tpep_pickup_datetime'].dt.floor(config.cube_freq).rename(bin_column)
+                counts[band] = band_df.groupby(pickup_bins).size().reset_index(name='pickup_count')
+                counts[band]['pickup_count'] = compact_counts(counts[band]['pickup_count'])
+            record['rows_out'] = month_record['rows_out'] = sum(len(band_counts) for band_counts in counts.values())
+    return counts
+
+
+# Out-of-core version of count_taxi_month with the same result. The file is streamed
+# in record batches, and each batch is scattered into one dense array of (band, bin)
+# counts, so memory is bounded by a batch plus the timeline however large the file.
+def stream_taxi_month(file_path, zones, config):
+    month = os.path.basename(file_path).rsplit('.', 1)[0].rsplit('_', 1)[-1]
+    time_range = timeline(config.start, config.end, config.cube_freq)
+    n_bins = len(time_range)
+    counts = np.zeros(len(config.bands) * n_bins, dtype=np.int64)
+
+    with stage('month', partition=month) as month_record:
+        filters = window_filters('tpep_pickup_datetime', config.start, config.end) + [('PULocationID', 'in', band_zone_ids(zones))]
+        batches = iter_parquet_batches(file_path, ["tpep_pickup_datetime", "PULocationID", "DOLocationID"], filters)
+        month_record['rows_in'] = 0
+        for batch in batches:
+            with stage('batch', rows_in=batch.num_rows) as record:
+                pickup_time = batch.column(0).cast(pa.timestamp('ns')).to_numpy(zero_copy_only=False)
+                pickup_ids = pc.fill_null(batch.column(1), -1).to_numpy()
+                dropoff_ids = pc.fill_null(batch.column(2), -1).to_numpy()
+
+                # Skip trips whose pickup or drop-off zone has no centroid, then count the
+                # rest by the band of the pickup zone and the bin of the pickup time
+                band = lookup(zones['band'], pickup_ids, -1).astype(np.int64)
+                bins = bin_index(pickup_time, time_range)
+                keep = (band >= 0) & (bins >= 0) & known_zones(zones, pickup_ids) & known_zones(zones, dropoff_ids)
+                counts += np.bincount(band[keep] * n_bins + bins[keep], minlength=counts.size)
+                record['rows_out'] = int(keep.sum())
+            month_record['rows_in'] += batch.num_rows
+
+        # Bins with pickups, in the layout of count_taxi_month
+        bin_column = f'pickup_time_{config.cube_freq}'
+        monthly_counts = {}
+        for code, band in enumerate(config.bands):
+            band_counts = counts[code * n_bins:(code + 1) * n_bins]
+            nonzero = np.flatnonzero(band_counts)
+            monthly_counts[band] = pd.DataFrame({bin_column: time_range[nonzero], 'pickup_count': compact_counts(band_counts[nonzero])})
+        month_record['rows_out'] = sum(len(band_counts) for band_counts in monthly_counts.values())
+    return monthly_counts
+
+
+# Pickups of one monthly taxi file per (pickup zone, time bin index), for counting
+# around many anchors at once. Streamed like stream_taxi_month, but as the zones times
+# the bins of the whole window can be far more than a month holds, each batch is
+# reduced to the counts of its (zone, bin) keys and added to the sorted keys of the
+# month, so memory follows the pairs with pickups.
+def count_taxi_zones(file_path, zones, config):
+    month = os.path.basename(file_path).rsplit('.', 1)[0].rsplit('_', 1)[-1]
+    time_range = timeline(config.start, config.end, config.freq)
+    n_bins = len(time_range)
+    keys, counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    with stage('month', partition=month) as month_record:
+        filters = window_filters('tpep_pickup_datetime', config.start, config.end)
+        batches = iter_parquet_batches(file_path, ["tpep_pickup_datetime", "PULocationID", "DOLocationID"], filters)
+        month_record['rows_in'] = 0
+        for batch in batches:
+            with stage('batch', rows_in=batch.num_rows) as record:
+                pickup_time = batch.column(0).cast(pa.timestamp('ns')).to_numpy(zero_copy_only=False)
+                pickup_ids = pc.fill_null(batch.column(1), -1).to_numpy().astype(np.int64)
+                dropoff_ids = pc.fill_null(batch.column(2), -1).to_numpy()
+
+                # Skip trips whose pickup or drop-off zone has no centroid
+                bins = bin_index(pickup_time, time_range)
+                keep = (bins >= 0) & known_zones(zones, pickup_ids) & known_zones(zones, dropoff_ids)
+                batch_keys, batch_counts = np.unique(pickup_ids[keep] * n_bins + bins[keep], return_counts=True)
+                keys, inverse = np.unique(np.concatenate([keys, batch_keys]), return_inverse=True)
+                counts = np.bincount(inverse, weights=np.concatenate([counts, batch_counts]),
+                                     minlength=len(keys)).astype(np.int64)
+                record['rows_out'] = int(keep.sum())
+            month_record['rows_in'] += batch.num_rows
+
+        zone, time_bin = np.divmod(keys, n_bins)
+        zone_counts = pd.DataFrame({'zone': zone.astype(np.int32), 'time_bin': time_bin, 'pickup_count': counts})
+        month_record['rows_out'] = len(zone_counts)
+    return zone_counts
+
+
+# Pickups of one monthly taxi file per (cell of `grid`, time bin), placing each pickup
+# in the cell of its zone centroid. The trips are those of count_taxi_month.
+def index_taxi_month(file_path, zones, config, grid):
+    month = os.path.basename(file_path).rsplit('.', 1)[0].rsplit('_', 1)[-1]
+    with stage('month', partition=month) as record:
+        df = read_parquet_filtered(file_path, ['tpep_pickup_datetime', 'PULocationID', 'DOLocationID'],
+                                   window_filters('tpep_pickup_datetime', config.start, config.end))
+        record['rows_in'] = len(df)
+        # Skip trips whose pickup or drop-off zone has no centroid
+        known = known_zones(zones, df['PULocationID']) & known_zones(zones, df['DOLocationID'])
+        zone_cells = grid.cell_ids(zones['latitude'], zones['longitude'])
+        cells = np.where(known, lookup(zone_cells, df['PULocationID'], -1), -1)
+        index_df = cell_counts(cells, df['tpep_pickup_datetime'], timeline(config.start, config.end, config.freq), name='pickup_count')
+        record['rows_out'] = len(index_df)
+    return index_df
+
+
+# Engines counting the pickups of one monthly taxi file: the whole month in pandas,
+# or streamed in record batches for archives too large to hold a month in memory
+TAXI_ENGINES = {
+    'memory': count_taxi_month,
+    'stream': stream_taxi_month,
+}
+
+
+# Yellow taxi pickups per time bin, one monthly parquet file per partition
+@register_source
+class TaxisSource(Source):
+    name = 'taxis'
+    zone_centroids_path = 'taxi-zones/zone_centroids.csv'
+    anchor_stem = 'yellow_taxis_pickup_counts_by_anchor'
+
+    def file_paths(self, config):
+        if config.all_months:
+            return sorted(glob.glob(config.data_path('data/yellow_tripdata_*.parquet')))
+        months = config.months or pd.period_range(config.start, config.end - pd.Timedelta(1), freq='M').strftime('%Y-%m')
+        return [config.data_path(f'data/yellow_tripdata_{month}.parquet') for month in months]
+
+    # Run `count_month(file_path, zones, config)` over the monthly files, with the
+    # zone table of the anchor. Cached results are kept under `cache_name` and keyed by
+    # `params` too, which must tell the count functions apart.
+    def map_months(self, count_month, config, cache_name=None, **params):
+        # Centroid, distance and band of every zone, indexed by LocationID
+        zone_centroids_file = config.data_path(self.zone_centroids_path)
+        zones = zone_table(pd.read_csv(zone_centroids_file), config.anchor, config.bands)
+        file_paths = self.file_paths(config)
+
+        cache = config.partition_cache(cache_name or self.name, zones=file_fingerprint(zone_centroids_file, config.cache_dir),
+                                       freq=config.freq, cube_freq=config.cube_freq, **params) if config.cache_dir else None
+        if cache is None:
+            return map_partitions(count_month, file_paths, config.workers, args=(zones, config))
+
+        # Only the months that are not cached yet are processed, concurrently
+        file_keys = [file_fingerprint(file_path, config.cache_dir) for file_path in file_paths]
+        monthly_counts = cache.map(count_month, file_paths, file_keys, config.workers, args=(zones, config))
+        cache.prune()
+        return monthly_counts
+
+    def read(self, config):
+        return self.map_months(TAXI_ENGINES[config.taxi_engine], config, engine=config.taxi_engine)
+
+    # Merge per-month counts of the cube bins; a monthly file can hold a few trips from
+    # the neighbouring months, so bins that show up in several files are summed. The
+    # outputs keep only the bins with pickups.
+    def aggregate(self, monthly_counts, config):
+        cube = CountCube(timeline(config.start, config.end, config.cube_freq), config.bands, time_prefix='pickup_time', sparse=True)
+        for code, band in enumerate(config.bands):
+            counts_df = pd.concat([counts[band] for counts in monthly_counts], ignore_index=True)
+            cube.add_counts('pickup_count', code, counts_df[f'pickup_time_{config.cube_freq}'], counts_df['pickup_count'])
+        rolled = cube.rollup(config.freq)
+
+        outputs = {'yellow_taxis_pickup_counts_cube': cube}
+        for band in config.bands:
+            outputs[f'yellow_taxis_pickup_counts_{band}'] = rolled.to_frame(band, f'pickup_time_{config.freq}')
+        return outputs
+
+    # Pickups are summed per (zone, bin) over the months first, then every zone is
+    # counted around the anchors from its centroid, as the bands of a single-anchor
+    # run are
+    def anchor_counts(self, config):
+        zone_centroids = pd.read_csv(config.data_path(self.zone_centroids_path))
+        zones = zone_table(zone_centroids, config.anchor, config.bands)
+        monthly_counts = self.map_months(count_taxi_zones, config, cache_name=f'{self.name}-zones')
+        zone_counts = pd.concat(monthly_counts, ignore_index=True).groupby(['zone', 'time_bin'], as_index=False)['pickup_count'].sum()
+
+        time_range = timeline(config.start, config.end, config.freq)
+        zone_ids = zone_counts['zone'].to_numpy()
+        with stage('count', rows_in=len(zone_counts)) as record:
+            counts_df = anchor_counts(zones['latitude'][zone_ids], zones['longitude'][zone_ids], time_range[zone_counts['time_bin']],
+                                      time_range, list(config.anchors.values()), config.bands,
+                                      weights={'pickup_count': zone_counts['pickup_count']}, name=None)
+            record['rows_out'] = len(counts_df)
+        return label_anchor_counts(counts_df, config.anchors, config.bands, f'pickup_time_{config.freq}')
+
+
+# Joined feature matrix per band, built from the outputs of the other sources
+@register_source
+class FeaturesSource(Source):
+    name = 'features'
+    derived = True
+    weather_path = "unprocessed-data/empire-state-weather-2014.csv"
+
+    def read(self, config):
+        # Timestamps may come back as strings when the outputs were saved as CSV
+        crashes_df = read_frame(config.output_path('crashes_raw'), config.output_format)
+        crashes_df['crash_datetime'] = pd.to_datetime(crashes_df['crash_datetime'])
+        shootings_df = read_frame(config.output_path('shootings_raw'), config.output_format)
+        shootings_df['occur_datetime'] = pd.to_datetime(shootings_df['occur_datetime'])
+        arrests_df = read_frame(config.output_path('arrests_F_and_M_raw'), config.output_format)
+        arrests_df['arrest_date'] = pd.to_datetime(arrests_df['arrest_date'])
+        holidays_df = read_frame(config.output_path(SOURCES['holidays'].output_stem(config)), config.output_format)
+        holidays_df['Date'] = pd.to_datetime(holidays_df['Date'])
+
+        bin_column = f'pickup_time_{config.freq}'
+        taxis = {}
+        for band in config.bands:
+            taxis[band] = read_frame(config.output_path(f'yellow_taxis_pickup_counts_{band}'), config.output_format)
+            taxis[band][bin_column] = pd.to_datetime(taxis[band][bin_column])
+
+        # Hours without rain have no rain_1h reading, and readings are stamped in
+        # UTC with the offset of the local time zone
+        weather_df = pd.read_csv(config.data_path(self.weather_path))
+        weather_df['rain_1h'] = weather_df['rain_1h'].fillna(0)
+        weather_df['time'] = pd.to_datetime(weather_df['dt'] + weather_df['timezone'], unit='s')
+
+        return {
+            'crashes': crashes_df,
+            'shootings': shootings_df,
+            'arrests': arrests_df,
+            'holidays': holidays_df,
+            'taxis': taxis,
+            'events': SOURCES['events'].read(config),
+            'weather': weather_df,
+        }
+
+    # One pass over the sources per band, scattering each into the shared timeline
+    def aggregate(self, inputs, config):
+        time_range = timeline(config.start, config.end, config.freq)
+        crashes_df, shootings_df, arrests_df = inputs['crashes'], inputs['shootings'], inputs['arrests']
+        events_df, weather_df = inputs['events'], inputs['weather']
+
+        outputs = {}
+        for band in config.bands:
+            features = FeatureMatrix(time_range)
+
+            taxis_df = inputs['taxis'][band]
+            features.add_counts('taxis_pickup_count', taxis_df[f'pickup_time_{config.freq}'], taxis_df['pickup_count'])
+
+            crashes_band = crashes_df[crashes_df['distance_band'] == band]
+            features.add_counts('number_of_crashes', crashes_band['crash_datetime'])
+            features.add_counts('number_of_persons_injured', crashes_band['crash_datetime'], crashes_band['number_of_persons_injured'])
+            features.add_counts('number_of_persons_killed', crashes_band['crash_datetime'], crashes_band['number_of_persons_killed'])
+
+            shootings_band = shootings_df[shootings_df['distance_band'] == band]
+            features.add_counts('shooting_count', shootings_band['occur_datetime'])
+
+            # Arrests are only dated, so each day's counts are repeated over its bins
+            arrests_band = arrests_df[arrests_df['distance_band'] == band]
+            features.add_counts('felony_count', arrests_band.loc[arrests_band['law_category'] == 'F', 'arrest_date'], freq='1D')
+            features.add_counts('misdemeanor_count', arrests_band.loc[arrests_band['law_category'] == 'M', 'arrest_date'], freq='1D')
+            features.add_counts('total_arrests', arrests_band['arrest_date'], freq='1D')
+
+            # Events and holidays are city-wide
+            features.add_intervals('event_count', events_df['Start Date/Time'], events_df['End Date/Time'])
+            features.add_flags('is_holiday', inputs['holidays']['Date'])
+
+            for column in ['temp', 'feels_like', 'humidity', 'wind_speed', 'rain_1h']:
+                features.add_asof(column, weather_df['time'], weather_df[column])
+
+            outputs[f'features_{band}'] = features.to_frame('time_interval')
+            # The same columns as a memory-mapped store that model training processes
+            # can open and slice concurrently without parsing
+            outputs[f'features_{band}_store'] = features
+        return outputs
+
+
+# Counts per cell of a uniform grid over the city (see ppc.grid) and time bin of the
+# point sources and the taxi pickups, for radius and per-cell queries without the raw
+# rows. The rows go through the reads and validation of their own sources, and are
+# counted chunk by chunk like the per-anchor counts of a batch run.
+@register_source
+class SpatialIndexSource(Source):
+    name = 'spatial_index'
+    derived = True
+    point_sources = ['crashes', 'shootings', 'arrests']
+
+    def read(self, config):
+        grid = SpatialGrid()
+        indexes = {}
+        for name in self.point_sources:
+            with stage(name):
+                indexes[name] = SOURCES[name].cell_index(config, grid)
+        with stage('taxis'):
+            monthly_index = SOURCES['taxis'].map_months(partial(index_taxi_month, grid=grid), config,
+                                                        cache_name='taxis-cells', grid=grid.params)
+            indexes['taxis'] = merge_cell_counts(monthly_index)
+        return indexes
+
+    def aggregate(self, indexes, config):
+        return {f'spatial_index_{name}': index_df for name, index_df in indexes.items()}
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# dtype policy of the in-memory frames. Coordinates are float32: at New York's
+# latitude that is under half a meter, far below the band edges and grid cells.
+COORDINATE_DTYPE = 'float32'
+
+# Short codes (law category, borough, event type) as categoricals
+CODE_DTYPE = 'category'
+
+# Per-row counts of the exports, e.g. persons injured in one crash. Nullable, so a
+# missing value stays missing instead of turning the column into floats.
+ROW_COUNT_DTYPE = 'Int16'
+
+
+# Smallest unsigned integer dtype holding the non-negative integer `values`, e.g. the
+# counts of a timeline. Sum such columns with a new count rather than `+`, which
+# keeps the small dtype and can overflow.
+def count_dtype(values):
+    values = np.asarray(values)
+    return np.min_scalar_type(int(values.max())) if len(values) else np.dtype(np.uint8)
+
+
+def compact_counts(values):
+    values = np.asarray(values)
+    return values.astype(count_dtype(values), copy=False)
+
+
+# dtype of the counts in the written outputs. The compact dtypes above depend on the
+# largest count of each run and band, so the files widen them to one schema that
+# stays the same across runs and that consumers can add up without wrapping.
+OUTPUT_COUNT_DTYPE = np.dtype(np.int64)
+
+
+# Counts widened to OUTPUT_COUNT_DTYPE; any other values are returned as they are
+def output_counts(values):
+    values = np.asarray(values)
+    return values.astype(OUTPUT_COUNT_DTYPE) if values.dtype.kind == 'u' else values
+
+
+# Frame with its compact count columns widened to OUTPUT_COUNT_DTYPE
+def output_frame(df):
+    counts = [column for column, dtype in df.dtypes.items() if isinstance(dtype, np.dtype) and dtype.kind == 'u']
+    return df.astype({column: OUTPUT_COUNT_DTYPE for column in counts}) if counts else df
+
+
+# Concatenate chunks read separately; categorical columns get the union of the
+# categories of all chunks instead of falling back to object strings
+def concat_chunks(chunks):
+    frame = pd.concat(chunks, ignore_index=True)
+    for column in chunks[0].columns:
+        if all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks):
+            frame[column] = pd.api.types.union_categoricals([chunk[column] for chunk in chunks])
+    return frame
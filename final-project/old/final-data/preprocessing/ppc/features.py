@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from ppc.dtypes import compact_counts
+from ppc.ingest import WINDOW_START, WINDOW_END
+from ppc.intervals import active_interval_counts
+from ppc.store import write_timeline
+
+
+# Regular timeline of `freq` bins covering [start, end)
+def timeline(start=WINDOW_START, end=WINDOW_END, freq='15min'):
+    return pd.date_range(start, end, freq=freq, inclusive='left')
+
+
+# Bin index of every timestamp on a regular timeline, -1 for timestamps outside it
+def bin_index(timestamps, time_range):
+    step = pd.Timedelta(time_range.freq).value
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    offsets = timestamps.view('int64') - time_range[0].value
+    index = offsets // step
+    index[np.isnat(timestamps) | (offsets < 0) | (index >= len(time_range))] = -1
+    return index
+
+
+# Feature columns over one shared timeline. Every source is scattered straight
+# into a preallocated column by its integer bin index, so no per-source
+# timeline, groupby or merge is needed.
+class FeatureMatrix:
+    def __init__(self, time_range):
+        self.time_range = time_range
+        self.columns = {}
+
+    # Number of bins
+    def __len__(self):
+        return len(self.time_range)
+
+    # Sum of `weights` (or number of rows) per bin. With a coarser `freq`, e.g. '1D',
+    # the sums are taken per coarse bin and repeated over the bins it covers. The
+    # column gets the smallest integer dtype holding the sums unless `dtype` is given.
+    def add_counts(self, name, timestamps, weights=None, freq=None, dtype=None):
+        time_range = self.time_range if freq is None else timeline(self.time_range[0].floor(freq), self.time_range[-1] + self.time_range.freq, freq)
+        index = bin_index(timestamps, time_range)
+        keep = index >= 0
+        if weights is not None:
+            weights = np.nan_to_num(np.asarray(weights, dtype=np.float64)[keep])
+        sums = np.bincount(index[keep], weights=weights, minlength=len(time_range))
+        sums = self._broadcast(sums, time_range)
+        self.columns[name] = compact_counts(sums) if dtype is None else sums.astype(dtype)
+
+    # 1 for bins whose coarse bin (a day by default) holds any of `timestamps`, else 0
+    def add_flags(self, name, timestamps, freq='1D'):
+        self.add_counts(name, timestamps, freq=freq, dtype=np.int64)
+        self.columns[name] = (self.columns[name] > 0).astype(np.int8)
+
+    # Number of intervals active in each bin (see ppc.intervals)
+    def add_intervals(self, name, starts, ends):
+        self.columns[name] = compact_counts(active_interval_counts(starts, ends, self.time_range[0], len(self.time_range),
+                                                                   self.time_range.freq))
+
+    # Latest observation at or before each bin, e.g. hourly weather readings
+    def add_asof(self, name, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        order = np.argsort(timestamps, kind='stable')
+        position = np.searchsorted(timestamps[order], self.time_range.values, side='right') - 1
+        values = np.asarray(values, dtype=np.float64)[order]
+        self.columns[name] = np.where(position >= 0, values[np.maximum(position, 0)], np.nan)
+
+    # Repeat the values of a coarser timeline over the bins of this one
+    def _broadcast(self, values, time_range):
+        if time_range is self.time_range:
+            return values
+        return values[bin_index(self.time_range.floor(time_range.freq), time_range)]
+
+    def to_frame(self, time_column='time_interval'):
+        return pd.DataFrame({time_column: self.time_range, **self.columns})
+
+    # Publish the columns as a memory-mapped timeline store (see ppc.store) at `path`
+    # and return the file path
+    def save(self, path):
+        return write_timeline(path, self.time_range, self.columns)
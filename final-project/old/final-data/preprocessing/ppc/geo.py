@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+
+# Earth radius in meters
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = EARTH_RADIUS_M * np.pi / 180
+
+# Empire State Building coordinates (lat, lon)
+EMPIRE_STATE = (40.748817, -73.985428)
+
+# Radius bands around an anchor: label -> (min, max) meters, both inclusive.
+# The labels match the suffixes of the output files.
+DEFAULT_BANDS = {
+    '1000m': (0, 1000),
+    '2000Am': (2000, np.inf),
+}
+
+
+# Vectorized Haversine formula to calculate distances in meters from an anchor.
+# The coordinate differences are taken in float64 and the trig is done in float32.
+def haversine_vectorized(lat, lon, anchor=EMPIRE_STATE):
+    anchor_lat, anchor_lon = anchor
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+
+    dlat = np.radians(lat - anchor_lat).astype(np.float32)
+    dlon = np.radians(lon - anchor_lon).astype(np.float32)
+    cos_lat = np.cos(np.radians(lat).astype(np.float32))
+    cos_anchor = np.float32(np.cos(np.radians(anchor_lat)))
+
+    a = np.sin(dlat / 2)**2 + cos_lat * cos_anchor * np.sin(dlon / 2)**2
+    c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1)))
+    return np.float32(EARTH_RADIUS_M) * c
+
+
+# Lat/lon box (lat_min, lat_max, lon_min, lon_max) that contains every point
+# within `radius` meters of the anchor, with a small safety margin
+def bounding_box(anchor, radius, margin=1.01):
+    anchor_lat, anchor_lon = anchor
+    dlat = radius * margin / METERS_PER_DEGREE
+    # Meridians converge towards the poles, so size the box at its widest latitude
+    widest_lat = min(abs(anchor_lat) + dlat, 89.9)
+    dlon = radius * margin / (METERS_PER_DEGREE * np.cos(np.radians(widest_lat)))
+    return anchor_lat - dlat, anchor_lat + dlat, anchor_lon - dlon, anchor_lon + dlon
+
+
+# Farthest finite band edge in meters: points beyond it can only fall into an
+# unbounded band
+def band_reach(bands):
+    edges = [edge for band in bands.values() for edge in band if np.isfinite(edge)]
+    return max(edges) if edges else 0
+
+
+# Band code per row for a single anchor (-1 for rows in no band)
+def _anchor_band_codes(lat, lon, anchor, bands):
+    codes = np.full(len(lat), -1, dtype=np.int8)
+    reach = band_reach(bands)
+
+    # Rows outside the box around the farthest finite edge are beyond it, so
+    # they can only fall into an unbounded band and need no trig at all
+    lat_min, lat_max, lon_min, lon_max = bounding_box(anchor, reach)
+    in_box = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    for code, (low, high) in enumerate(bands.values()):
+        if np.isinf(high):
+            codes[~in_box & ~np.isnan(lat) & ~np.isnan(lon)] = code
+            break
+
+    # Distance is computed once for the rows in the box; the first matching band wins
+    box_idx = np.flatnonzero(in_box)
+    distances = haversine_vectorized(lat[box_idx], lon[box_idx], anchor)
+    box_codes = np.full(len(box_idx), -1, dtype=np.int8)
+    for code, (low, high) in reversed(list(enumerate(bands.values()))):
+        box_codes[(distances >= low) & (distances <= high)] = code
+    codes[box_idx] = box_codes
+    return codes
+
+
+# Band code per row and anchor, shape (rows, anchors), with -1 for rows in no band.
+# Codes index into list(bands).
+def band_codes(lat, lon, anchors=(EMPIRE_STATE,), bands=DEFAULT_BANDS):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    codes = np.empty((len(lat), len(anchors)), dtype=np.int8)
+    for i, anchor in enumerate(anchors):
+        codes[:, i] = _anchor_band_codes(lat, lon, anchor, bands)
+    return codes
+
+
+# Band label per row for a single anchor, as a categorical (NaN for rows in no band)
+def assign_bands(lat, lon, anchor=EMPIRE_STATE, bands=DEFAULT_BANDS):
+    codes = band_codes(lat, lon, (anchor,), bands)[:, 0]
+    return pd.Categorical.from_codes(codes, categories=list(bands))
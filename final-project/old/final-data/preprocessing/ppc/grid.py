@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from ppc.geo import METERS_PER_DEGREE, EMPIRE_STATE, DEFAULT_BANDS, band_codes
+from ppc.features import bin_index
+
+
+# Extent of the grid around New York City (lat_min, lat_max, lon_min, lon_max)
+NYC_BBOX = (40.49, 40.92, -74.27, -73.68)
+
+# Side of a grid cell in meters
+CELL_SIZE_M = 100
+
+
+# Uniform lat/lon grid over the city. Point events are aggregated per (cell, time bin)
+# once, and any radius or per-cell query is then answered from those aggregates by
+# classifying the cell centers, without going back to the raw rows. A cell belongs to
+# a radius band when its center does, so counts are exact up to half a cell diagonal
+# (~71m for 100m cells) at the band edges.
+class SpatialGrid:
+    def __init__(self, bbox=NYC_BBOX, cell_size=CELL_SIZE_M):
+        self.lat_min, self.lat_max, self.lon_min, self.lon_max = bbox
+        self.cell_size = cell_size
+        self.dlat = cell_size / METERS_PER_DEGREE
+        self.dlon = cell_size / (METERS_PER_DEGREE * np.cos(np.radians((self.lat_min + self.lat_max) / 2)))
+        self.n_rows = int(np.ceil((self.lat_max - self.lat_min) / self.dlat))
+        self.n_cols = int(np.ceil((self.lon_max - self.lon_min) / self.dlon))
+        self.n_cells = self.n_rows * self.n_cols
+
+    # Extent and cell size, which key the counts cached per cell
+    @property
+    def params(self):
+        return self.lat_min, self.lat_max, self.lon_min, self.lon_max, self.cell_size
+
+    # Cell id of every point, -1 for points outside the grid or without coordinates
+    def cell_ids(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            rows = np.floor((lat - self.lat_min) / self.dlat)
+            cols = np.floor((lon - self.lon_min) / self.dlon)
+            inside = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+        cells = np.full(len(lat), -1, dtype=np.int32)
+        cells[inside] = rows[inside].astype(np.int32) * self.n_cols + cols[inside].astype(np.int32)
+        return cells
+
+    # Center coordinates (lat, lon) of the given cells, all cells by default
+    def cell_centers(self, cells=None):
+        cells = np.arange(self.n_cells) if cells is None else np.asarray(cells)
+        rows, cols = np.divmod(cells, self.n_cols)
+        return self.lat_min + (rows + 0.5) * self.dlat, self.lon_min + (cols + 0.5) * self.dlon
+
+    # Band code of every cell (see ppc.geo.band_codes), shape (cells, anchors)
+    def cell_bands(self, anchors=(EMPIRE_STATE,), bands=DEFAULT_BANDS):
+        lat, lon = self.cell_centers()
+        return band_codes(lat, lon, anchors, bands)
+
+
+# Aggregate point events into a long (cell, time_bin, count) table. Rows outside the
+# grid or the timeline are dropped; `weights` are summed instead of counting rows.
+def cell_counts(cells, timestamps, time_range, weights=None, name='count'):
+    bins = bin_index(timestamps, time_range)
+    keep = (np.asarray(cells) >= 0) & (bins >= 0)
+    keys = np.asarray(cells, dtype=np.int64)[keep] * len(time_range) + bins[keep]
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    if weights is None:
+        sums = np.bincount(inverse, minlength=len(unique_keys))
+    else:
+        sums = np.bincount(inverse, weights=np.nan_to_num(np.asarray(weights, dtype=np.float64)[keep]),
+                           minlength=len(unique_keys)).astype(np.int64)
+
+    cell, time_bin = np.divmod(unique_keys, len(time_range))
+    return pd.DataFrame({'cell': cell.astype(np.int32), 'time_bin': time_range[time_bin], name: sums})
+
+
+# Merge (cell, time_bin) tables built from separate chunks or partitions
+def merge_cell_counts(tables):
+    index_df = pd.concat(tables, ignore_index=True)
+    return index_df.groupby(['cell', 'time_bin'], as_index=False).sum()
+
+
+# Take the counts of `removed_df` off `index_df`, dropping the keys left without any
+def subtract_cell_counts(index_df, removed_df):
+    values = [column for column in removed_df.columns if column not in ('cell', 'time_bin')]
+    removed_df = removed_df.assign(**{column: -removed_df[column] for column in values})
+    index_df = merge_cell_counts([index_df, removed_df])
+    return index_df[(index_df[values] != 0).any(axis=1)].reset_index(drop=True)
+
+
+# Counts per time bin of the cells in each band around `anchor`, one column per band
+def band_counts(index_df, grid, time_range, anchor=EMPIRE_STATE, bands=DEFAULT_BANDS, name='count'):
+    codes = grid.cell_bands((anchor,), bands)[:, 0][index_df['cell'].to_numpy()]
+    bins = bin_index(index_df['time_bin'], time_range)
+    keep = (codes >= 0) & (bins >= 0)
+    counts = np.zeros((len(time_range), len(bands)), dtype=np.int64)
+    np.add.at(counts, (bins[keep], codes[keep]), index_df[name].to_numpy()[keep])
+    return pd.DataFrame(counts, index=time_range, columns=list(bands))
+
+
+# Total per cell for the whole city, with the cell centers
+def per_cell_totals(index_df, grid, name='count'):
+    totals = index_df.groupby('cell', as_index=False)[name].sum()
+    totals['latitude'], totals['longitude'] = grid.cell_centers(totals['cell'].to_numpy())
+    return totals
@@ -0,0 +1,151 @@
+import io
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ppc.cache import digest
+from ppc.dtypes import concat_chunks
+from ppc.instrument import stage, iter_stage
+from ppc.parallel import imap_partitions
+
+
+# Study window shared by the preprocessors (end is exclusive)
+WINDOW_START = pd.Timestamp('2014-04-01')
+WINDOW_END = pd.Timestamp('2014-10-01')
+
+# Number of raw rows held in memory at once while streaming an export
+CHUNK_SIZE = 500_000
+
+# Bytes of raw CSV per cached partition
+BLOCK_SIZE = 64 * 1024 * 1024
+
+# Bytes of raw CSV blocks a read keeps queued for or parsing in its workers at once
+IN_FLIGHT_BYTES = 4 * BLOCK_SIZE
+
+# Rows per record batch when streaming a parquet file
+PARQUET_BATCH_SIZE = 1_000_000
+
+
+# Boolean mask for timestamps inside [start, end)
+def window_mask(timestamps, start=WINDOW_START, end=WINDOW_END):
+    return (timestamps >= start) & (timestamps < end)
+
+
+# Split a CSV file into blocks of whole records, yielding (header, block) bytes.
+# Blocks only depend on the bytes before their end, so appending rows to the file
+# leaves every block but the last one unchanged.
+def iter_csv_blocks(file_path, block_size=BLOCK_SIZE):
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        carry = b''
+        for data in iter(lambda: f.read(block_size), b''):
+            data = carry + data
+            # Cut at the last newline that is not inside a quoted field
+            cut = data.rfind(b'\n')
+            while cut != -1 and data.count(b'"', 0, cut) % 2:
+                cut = data.rfind(b'\n', 0, cut)
+            if cut == -1:
+                carry = data
+                continue
+            yield header, data[:cut + 1]
+            carry = data[cut + 1:]
+        if carry:
+            yield header, carry
+
+
+# Project, rename and filter one raw chunk
+def _prepare_chunk(chunk, columns, chunk_filter):
+    # usecols keeps the file order, so put the columns back in the requested order
+    chunk = chunk[list(columns)].rename(columns=columns)
+    if chunk_filter is not None:
+        chunk = chunk_filter(chunk)
+    return chunk
+
+
+# Raw bytes of a (header, block) pair, nothing for a cached block
+def _block_bytes(header_block):
+    return 0 if header_block is None else len(header_block[1])
+
+
+# Parse one (header, block) pair of a CSV file, or nothing for a block that is
+# already cached
+def _parse_block(header_block, columns, dtypes, chunk_filter):
+    if header_block is None:
+        return None
+    header, block = header_block
+    with stage('read_csv') as record:
+        chunk = pd.read_csv(io.BytesIO(header + block), usecols=list(columns), dtype=dtypes)
+        record['rows_out'] = len(chunk)
+    return _prepare_chunk(chunk, columns, chunk_filter)
+
+
+# Stream a large CSV export in chunks, reading only the needed columns.
+# `columns` maps raw column names to the names used by the scripts, `dtypes`
+# is keyed by the raw names, and `chunk_filter` receives each renamed chunk
+# and returns the rows to keep, so peak memory is bounded by `chunksize`.
+#
+# With a PartitionCache or several workers (or with `blocks`) the file is split
+# into byte blocks instead. Blocks are parsed and filtered by `workers` processes,
+# with at most IN_FLIGHT_BYTES of them queued (`chunk_filter` must then be
+# picklable, e.g. a functools.partial of a method), and with a cache the filtered
+# rows of each block are cached by the block's content hash, so after an append
+# only the new blocks are parsed again. The name and params of the cache must tell
+# the chunk filters apart.
+#
+# The kept chunks are concatenated, or passed as a list to `combine` when the
+# filter returns something else than frames.
+def read_csv_chunked(file_path, columns, dtypes=None, chunk_filter=None, chunksize=CHUNK_SIZE, cache=None, workers=1,
+                     blocks=None, combine=None):
+    if blocks is None:
+        blocks = cache is not None or workers > 1
+    if not blocks:
+        reader = pd.read_csv(file_path, usecols=list(columns), dtype=dtypes, chunksize=chunksize)
+        kept_chunks = [_prepare_chunk(chunk, columns, chunk_filter) for chunk in iter_stage('read_csv', reader)]
+    else:
+        read_key = digest((list(columns.items()), sorted((dtypes or {}).items())))
+        block_keys = []
+
+        def header_blocks():
+            for header, block in iter_csv_blocks(file_path):
+                block_keys.append(digest(block) + read_key)
+                cached = cache is not None and cache.contains(block_keys[-1])
+                yield None if cached else (header, block)
+
+        kept_chunks = []
+        parsed_blocks = imap_partitions(_parse_block, header_blocks(), workers, args=(columns, dtypes, chunk_filter),
+                                        item_bytes=_block_bytes, max_bytes=IN_FLIGHT_BYTES)
+        for position, chunk in enumerate(parsed_blocks):
+            if cache is not None:
+                if chunk is None:
+                    chunk = cache.get(block_keys[position])
+                else:
+                    cache.put(block_keys[position], chunk)
+            kept_chunks.append(chunk)
+
+    if combine is not None:
+        return combine(kept_chunks)
+    if not kept_chunks:
+        return pd.DataFrame(columns=list(columns.values()))
+    return concat_chunks(kept_chunks)
+
+
+# Read only `columns` of a parquet file, pushing `filters` (pyarrow DNF format,
+# e.g. [('PULocationID', 'in', [...])]) down to the reader so row groups and
+# pages whose statistics cannot match are skipped
+def read_parquet_filtered(file_path, columns, filters=None):
+    return pd.read_parquet(file_path, engine='pyarrow', columns=list(columns), filters=filters or None)
+
+
+# Stream `columns` of a parquet file as pyarrow record batches, with `filters` (same
+# format as read_parquet_filtered) pushed down. Only one batch is read ahead, so
+# memory is bounded by `batch_size` rows however large the file is.
+def iter_parquet_batches(file_path, columns, filters=None, batch_size=PARQUET_BATCH_SIZE):
+    dataset = ds.dataset(file_path, format='parquet')
+    scanner = dataset.scanner(columns=list(columns), filter=pq.filters_to_expression(filters) if filters else None,
+                              batch_size=batch_size, batch_readahead=1, fragment_readahead=1)
+    return scanner.to_batches()
+
+
+# Parquet filters for timestamps inside [start, end)
+def window_filters(column, start=WINDOW_START, end=WINDOW_END):
+    return [(column, '>=', pd.Timestamp(start)), (column, '<', pd.Timestamp(end))]
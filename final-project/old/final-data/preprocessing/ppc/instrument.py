@@ -0,0 +1,178 @@
+import sys
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Stages open in this process, innermost last
+_open_stages = []
+
+# Finished stage records of this process, keyed by (stage path, partition)
+_records = {}
+
+
+# Peak resident set size of this process in MB. On Linux the peak is read from
+# /proc and can be reset between stages; elsewhere it is the peak of the process.
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+# Peak of the memory traced by tracemalloc in MB, None when it is not tracing
+def peak_traced_mb():
+    return tracemalloc.get_traced_memory()[1] / 2 ** 20 if tracemalloc.is_tracing() else None
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+# Fold the current peaks into every open stage, before a nested stage resets them
+def _checkpoint():
+    rss, traced = peak_rss_mb(), peak_traced_mb()
+    for frame in _open_stages:
+        frame['peak_rss_mb'] = _max(frame['peak_rss_mb'], rss)
+        frame['peak_traced_mb'] = _max(frame['peak_traced_mb'], traced)
+
+
+def _reset_peaks():
+    reset_peak_rss()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+# Add a finished stage to the records; a stage run again with the same partition
+# (e.g. once per chunk) adds up into one record
+def _add_record(record):
+    key = (record['stage'], record['partition'])
+    total = _records.get(key)
+    if total is None:
+        _records[key] = dict(record)
+        return
+    total['started_at'] = min(total['started_at'], record['started_at'])
+    for column in ['wall_s', 'cpu_s', 'calls']:
+        total[column] += record[column]
+    for column in ['rows_in', 'rows_out']:
+        if record[column] is not None:
+            total[column] = (total[column] or 0) + record[column]
+    for column in ['peak_rss_mb', 'peak_traced_mb']:
+        total[column] = _max(total[column], record[column])
+
+
+# Record wall time, CPU time, rows in/out and peak memory of the body of the `with`
+# block. Stages nest into paths like 'taxis/read/month'; a partition label (e.g. the
+# month of a file) is inherited by the nested stages. The body can set the rows
+# on the yielded record:
+#
+#     with stage('parse', rows_in=len(chunk)) as record:
+#         ...
+#         record['rows_out'] = len(chunk)
+@contextmanager
+def stage(name, rows_in=None, partition=None):
+    _checkpoint()
+    parent = _open_stages[-1] if _open_stages else None
+    frame = {
+        'stage': f"{parent['stage']}/{name}" if parent else name,
+        'partition': partition if partition is not None or parent is None else parent['partition'],
+        'started_at': time.time(),
+        'rows_in': rows_in,
+        'rows_out': None,
+        'peak_rss_mb': None,
+        'peak_traced_mb': None,
+    }
+    _open_stages.append(frame)
+    _reset_peaks()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield frame
+    finally:
+        wall_s, cpu_s = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _checkpoint()
+        _open_stages.pop()
+        _add_record({**frame, 'wall_s': wall_s, 'cpu_s': cpu_s, 'calls': 1})
+
+
+# Yield the items of `iterable`, timing the pull of each one as stage `name`. Used for
+# readers that do their work while being iterated, like a chunked pandas reader.
+def iter_stage(name, iterable):
+    items = iter(iterable)
+    while True:
+        with stage(name) as record:
+            item = next(items, None)
+            record['rows_out'] = 0 if item is None else len(item)
+        if item is None:
+            return
+        yield item
+
+
+# Records of this process, every stage right after the stage it is nested in and
+# siblings in the order they started (stages of parallel workers interleave in time)
+def records():
+    starts = {key: record['started_at'] for key, record in _records.items()}
+
+    def order(record):
+        parts = record['stage'].split('/')
+        paths = ['/'.join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+        return tuple(starts.get((path, record['partition']), starts.get((path, None), record['started_at'])) for path in paths)
+
+    return sorted((dict(record) for record in _records.values()), key=order)
+
+
+def clear():
+    _records.clear()
+
+
+# Run `func(item, *args)` in a worker process and return its result with the stage
+# records it made, to be merged back into the parent with `merge`
+def collect(func, item, args):
+    # A forked worker starts with a copy of the parent's stages
+    _open_stages.clear()
+    _records.clear()
+    result = func(item, *args)
+    return result, records()
+
+
+# Merge stage records of a worker process under the stage open in this process
+def merge(worker_records):
+    parent = _open_stages[-1] if _open_stages else None
+    for record in worker_records:
+        if parent is not None:
+            record = {**record, 'stage': f"{parent['stage']}/{record['stage']}"}
+            if record['partition'] is None:
+                record['partition'] = parent['partition']
+        _add_record(record)
+
+
+def report_frame():
+    columns = ['stage', 'partition', 'calls', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'peak_rss_mb', 'peak_traced_mb']
+    report_df = pd.DataFrame(records(), columns=columns + ['started_at'])[columns]
+    return report_df.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+
+# Write the run report as CSV (one row per stage and partition) or, for any other
+# extension, as JSON with the `run` parameters next to the stages
+def write_report(path, run=None):
+    if path.endswith('.csv'):
+        report_frame().to_csv(path, index=False)
+    else:
+        with open(path, 'w') as file:
+            json.dump({'run': run or {}, 'stages': records()}, file, indent=2, default=str)
+    return path
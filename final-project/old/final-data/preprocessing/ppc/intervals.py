@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+# Number of active intervals at every bin of a regular timeline, computed with a
+# difference array instead of matching each interval against the whole timeline.
+#
+# Like pd.date_range(start, end, freq), an interval covers the bins
+# start, start + freq, ... up to end, so only intervals whose start lies on the
+# timeline grid are counted. `groups` optionally holds an integer code per
+# interval (e.g. from pd.factorize) and adds one column per code to the result.
+def active_interval_counts(starts, ends, origin, periods, freq='15min', groups=None, n_groups=None):
+    step = pd.Timedelta(freq).value
+    starts = np.asarray(starts, dtype='datetime64[ns]')
+    ends = np.asarray(ends, dtype='datetime64[ns]')
+    valid = ~np.isnat(starts) & ~np.isnat(ends)
+
+    # Offsets from the timeline origin in nanoseconds
+    starts = starts.view('int64') - pd.Timestamp(origin).value
+    ends = ends.view('int64') - pd.Timestamp(origin).value
+
+    # First and last bin index covered by each interval
+    first_bin = starts // step
+    last_bin = np.minimum(ends // step, periods - 1)
+
+    valid &= (starts % step == 0) & (first_bin <= last_bin) & (first_bin < periods) & (last_bin >= 0)
+    if groups is not None:
+        groups = np.asarray(groups)
+        valid &= groups >= 0
+        groups = groups[valid]
+    first_bin = np.maximum(first_bin[valid], 0)
+    last_bin = last_bin[valid]
+
+    # +1 where an interval becomes active, -1 right after its last bin
+    if groups is None:
+        diff = np.zeros(periods + 1, dtype=np.int64)
+        np.add.at(diff, first_bin, 1)
+        np.add.at(diff, last_bin + 1, -1)
+    else:
+        if n_groups is None:
+            n_groups = int(groups.max()) + 1 if len(groups) else 0
+        diff = np.zeros((periods + 1, n_groups), dtype=np.int64)
+        np.add.at(diff, (first_bin, groups), 1)
+        np.add.at(diff, (last_bin + 1, groups), -1)
+
+    return np.cumsum(diff, axis=0)[:periods]
+
+
+# DataFrame wrapper: counts of active events per bin of `time_range`, either as a
+# single `name` column or, with `by`, one `<name>_<value>` column per value of `by`.
+def interval_counts(events_df, start_col, end_col, time_range, by=None, name='event_count'):
+    origin = time_range[0]
+    periods = len(time_range)
+    freq = time_range.freq
+
+    if by is None:
+        counts = active_interval_counts(events_df[start_col], events_df[end_col], origin, periods, freq)
+        return pd.DataFrame({name: counts}, index=time_range)
+
+    codes, labels = pd.factorize(events_df[by])
+    counts = active_interval_counts(events_df[start_col], events_df[end_col], origin, periods, freq,
+                                    groups=codes, n_groups=len(labels))
+    # Events with a missing `by` value get code -1 and are left out of the breakdown
+    return pd.DataFrame(counts, index=time_range, columns=[f'{name}_{label}' for label in labels])
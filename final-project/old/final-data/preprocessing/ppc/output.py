@@ -0,0 +1,61 @@
+import os
+import pandas as pd
+
+from ppc.dtypes import output_frame
+
+
+# Supported output formats and their file extensions
+OUTPUT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Format used when none is given, overridable per run with PPC_OUTPUT_FORMAT
+DEFAULT_OUTPUT_FORMAT = os.environ.get('PPC_OUTPUT_FORMAT', 'csv')
+
+
+# Write a frame to `path` + the extension of `output_format` and return the file path.
+# Parquet and Feather (Arrow IPC) keep the datetime, integer and categorical dtypes
+# so pandas and R arrow can load them without parsing; compact counts are written
+# as ppc.dtypes.OUTPUT_COUNT_DTYPE.
+def write_frame(df, path, output_format=None):
+    output_format = output_format or DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {list(OUTPUT_FORMATS)}")
+    df = output_frame(df)
+
+    output_file = path + OUTPUT_FORMATS[output_format]
+    if output_format == 'csv':
+        df.to_csv(output_file, index=False)
+    elif output_format == 'parquet':
+        df.to_parquet(output_file, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(output_file)
+    return output_file
+
+
+# Write one output of a source: a frame with write_frame, anything else (e.g. a
+# ppc.cube.CountCube) with its own `save(path)`
+def write_output(output, path, output_format=None):
+    if isinstance(output, pd.DataFrame):
+        return write_frame(output, path, output_format)
+    return output.save(path)
+
+
+# Read a frame saved by write_frame under `path` in `output_format`. Only that
+# format is read, so a file left over from a run in another format is never taken
+# for the current one.
+def read_frame(path, output_format=None):
+    output_format = output_format or DEFAULT_OUTPUT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {list(OUTPUT_FORMATS)}")
+
+    input_file = path + OUTPUT_FORMATS[output_format]
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"No {output_format} file found for {path}: {input_file}")
+    if output_format == 'csv':
+        return pd.read_csv(input_file)
+    if output_format == 'parquet':
+        return pd.read_parquet(input_file)
+    return pd.read_feather(input_file)
@@ -0,0 +1,63 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ppc.instrument import collect, merge
+
+
+# Default number of worker processes: one per available core
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Apply `func(item, *args)` to every item, in a process pool when workers > 1.
+# Results come back in the order of `items`, and the stages the workers record are
+# merged under the caller's open stage; `func` must be a module-level function so
+# it can be pickled into the workers.
+def map_partitions(func, items, workers=None, args=()):
+    items = list(items)
+    workers = min(workers or default_workers(), len(items)) if items else 1
+    if workers <= 1:
+        return [func(item, *args) for item in items]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(collect, func, item, args) for item in items]
+        results = []
+        for future in futures:
+            result, worker_records = future.result()
+            merge(worker_records)
+            results.append(result)
+        return results
+
+
+# Like map_partitions, but the items are taken lazily and the results yielded in
+# order, with at most `window` items (default: two per worker) submitted and not yet
+# yielded, so memory stays bounded however many items there are. With `item_bytes`
+# (a function of an item), the items in flight also hold at most `max_bytes` of
+# input, though always at least one item.
+def imap_partitions(func, items, workers=None, args=(), window=None, item_bytes=None, max_bytes=None):
+    workers = workers or default_workers()
+    if workers <= 1:
+        for item in items:
+            yield func(item, *args)
+        return
+
+    def result(future):
+        value, worker_records = future.result()
+        merge(worker_records)
+        return value
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        pending_bytes = 0
+        for item in items:
+            size = item_bytes(item) if item_bytes else 0
+            while pending and (len(pending) >= (window or 2 * workers) or
+                               (max_bytes is not None and pending_bytes + size > max_bytes)):
+                future, future_bytes = pending.popleft()
+                pending_bytes -= future_bytes
+                yield result(future)
+            pending.append((pool.submit(collect, func, item, args), size))
+            pending_bytes += size
+        while pending:
+            yield result(pending.popleft()[0])
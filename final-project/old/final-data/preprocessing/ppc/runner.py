@@ -0,0 +1,128 @@
+import os
+import argparse
+import cProfile
+import tracemalloc
+
+from ppc.anchors import read_anchors
+from ppc.cube import CUBE_FREQ
+# Importing the datasets registers every source, also in the worker processes
+from ppc.datasets import TAXI_ENGINES
+from ppc.geo import EMPIRE_STATE
+from ppc.ingest import WINDOW_START, WINDOW_END
+from ppc.instrument import report_frame, write_report
+from ppc.output import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from ppc.parallel import default_workers, map_partitions
+from ppc.sources import RunConfig, SOURCES
+
+
+# Run one registered source, returning its written file paths
+def run_source(name, config):
+    return SOURCES[name].run(config)
+
+
+# Count one registered source around every anchor of a batch run
+def run_anchor_source(name, config):
+    return SOURCES[name].run_anchors(config)
+
+
+# Split the run's worker budget between `n` sources running side by side: the
+# number of sources run at once, and the config each of them gets, whose workers
+# are what is left of the budget for the pools it starts itself (block parsing,
+# taxi months), so the run never starts much more than config.workers processes
+def split_workers(config, n):
+    concurrent = max(min(config.workers, n), 1)
+    return concurrent, config.with_workers(max(config.workers // concurrent, 1))
+
+
+# Run the named sources (default: all). Primary sources run concurrently, sharing
+# the workers; derived sources read their outputs, so they run afterwards with all
+# of them.
+def run(config, names=None):
+    names = list(names or SOURCES)
+    if config.anchors:
+        return run_anchors(config, names)
+    primary = [name for name in names if not SOURCES[name].derived]
+    derived = [name for name in names if SOURCES[name].derived]
+    os.makedirs(config.output_dir, exist_ok=True)
+
+    output_files = []
+    concurrent, source_config = split_workers(config, len(primary))
+    for paths in map_partitions(run_source, primary, concurrent, args=(source_config,)):
+        output_files.extend(paths)
+    for name in derived:
+        output_files.extend(run_source(name, config))
+    return output_files
+
+
+# Batch run over config.anchors: each named source with locations is scanned once,
+# side by side and sharing the workers, and counted around all anchors; the others
+# are skipped
+def run_anchors(config, names):
+    names = [name for name in names if SOURCES[name].anchor_stem]
+    os.makedirs(config.output_dir, exist_ok=True)
+
+    output_files = []
+    concurrent, source_config = split_workers(config, len(names))
+    for paths in map_partitions(run_anchor_source, names, concurrent, args=(source_config,)):
+        output_files.extend(paths)
+    return output_files
+
+
+# Radius band as LABEL:MIN:MAX in meters, with 'inf' for an unbounded band
+def parse_band(value):
+    label, low, high = value.split(':')
+    return label, (float(low), float(high))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Preprocess the NYC datasets around an anchor point')
+    parser.add_argument('--data-dir', default='.', help='directory holding unprocessed-data/, data/ and taxi-zones/')
+    parser.add_argument('--output-dir', default='.', help='directory the outputs and the cache are written to')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), help='sources to run (default: all)')
+    parser.add_argument('--start', default=str(WINDOW_START.date()), help='first date of the window')
+    parser.add_argument('--end', default=str(WINDOW_END.date()), help='date the window stops at (exclusive)')
+    parser.add_argument('--anchor', nargs=2, type=float, default=EMPIRE_STATE, metavar=('LAT', 'LON'), help='point the radius bands are measured from')
+    parser.add_argument('--bands', nargs='+', type=parse_band, metavar='LABEL:MIN:MAX', help='radius bands in meters (default: 1000m:0:1000 2000Am:2000:inf)')
+    parser.add_argument('--anchors', help='CSV of anchors (name, latitude, longitude) to count the sources around in one batch, instead of the usual outputs')
+    parser.add_argument('--freq', default='15min', help='width of the time bins')
+    parser.add_argument('--cube-freq', default=CUBE_FREQ, help='width of the finest bins, saved in the *_cube.npz files and rolled up to --freq')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default=DEFAULT_OUTPUT_FORMAT, help='file format of the outputs')
+    parser.add_argument('--workers', type=int, default=default_workers(), help='number of worker processes')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the partition cache')
+    parser.add_argument('--months', nargs='+', help='taxi months to process as YYYY-MM (default: the months of the window)')
+    parser.add_argument('--all-months', action='store_true', help='process every yellow_tripdata_*.parquet file in data/')
+    parser.add_argument('--taxi-engine', choices=list(TAXI_ENGINES), default='memory', help='count each taxi month in memory, or stream it in bounded memory')
+    parser.add_argument('--report', help='write the per-stage run report to this .json or .csv file')
+    parser.add_argument('--profile', help='write cProfile stats of the main process to this file (use --workers 1 to profile every stage)')
+    parser.add_argument('--tracemalloc', help='trace Python allocations, add their peak to the report and dump a snapshot to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config_args = {'bands': dict(args.bands)} if args.bands else {}
+    if args.anchors:
+        config_args['anchors'] = read_anchors(args.anchors)
+    config = RunConfig(data_dir=args.data_dir, output_dir=args.output_dir, start=args.start, end=args.end,
+                       anchor=args.anchor, freq=args.freq, output_format=args.output_format,
+                       workers=args.workers, cache=not args.no_cache, months=args.months,
+                       all_months=args.all_months, taxi_engine=args.taxi_engine, cube_freq=args.cube_freq, **config_args)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+
+    output_files = run(config, args.sources)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    if args.tracemalloc:
+        tracemalloc.take_snapshot().dump(args.tracemalloc)
+    print("Files saved:\n" + "\n".join(output_files))
+
+    if args.report:
+        print(report_frame().round(3).to_string(index=False))
+        print(f"Run report saved to {write_report(args.report, run=vars(args))}")
@@ -0,0 +1,283 @@
+import os
+import copy
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from ppc.anchors import anchor_counts, merge_anchor_counts, subtract_anchor_counts, label_anchor_counts
+from ppc.cache import PartitionCache
+from ppc.cube import CUBE_FREQ, rollup_index
+from ppc.dtypes import concat_chunks
+from ppc.features import timeline
+from ppc.geo import EMPIRE_STATE, DEFAULT_BANDS, assign_bands
+from ppc.grid import cell_counts, merge_cell_counts, subtract_cell_counts
+from ppc.ingest import WINDOW_START, WINDOW_END, read_csv_chunked
+from ppc.instrument import stage
+from ppc.output import DEFAULT_OUTPUT_FORMAT, write_frame, write_output
+from ppc.parallel import default_workers
+from ppc.timestamps import decode_timestamps
+from ppc.validate import validate_chunk, chunk_hashes, duplicate_hashes, repeated_hashes, drop_repeated_rows
+
+
+# Parameters shared by every source of a run: where inputs and outputs live, the
+# date window [start, end), the anchor and its radius bands, and the bin width of the
+# outputs, rolled up from the finer bins of the count cubes
+class RunConfig:
+    def __init__(self, data_dir='.', output_dir='.', start=WINDOW_START, end=WINDOW_END,
+                 anchor=EMPIRE_STATE, bands=DEFAULT_BANDS, freq='15min',
+                 output_format=DEFAULT_OUTPUT_FORMAT, workers=None, cache=True,
+                 months=None, all_months=False, taxi_engine='memory', anchors=None,
+                 cube_freq=CUBE_FREQ):
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.anchor = tuple(anchor)
+        self.bands = dict(bands)
+        self.freq = freq
+        self.cube_freq = cube_freq
+        # Fail before reading anything when freq is no rollup of the cube bins
+        rollup_index(timeline(self.start, self.end, cube_freq), freq)
+        self.output_format = output_format
+        self.workers = workers or default_workers()
+        self.cache_dir = os.path.join(output_dir, 'ppc-cache') if cache else None
+        # Taxi months to process as YYYY-MM (default: the months of the window),
+        # or every monthly file found with all_months
+        self.months = months
+        self.all_months = all_months
+        # How each taxi month is counted (see ppc.datasets.TAXI_ENGINES)
+        self.taxi_engine = taxi_engine
+        # Anchors of a batch run as name -> (lat, lon): every source with locations is
+        # counted around all of them instead of producing its usual outputs
+        self.anchors = dict(anchors) if anchors else None
+
+    # Copy of the config with another worker budget, e.g. the share of the run's
+    # workers left to one of the sources running side by side
+    def with_workers(self, workers):
+        config = copy.copy(self)
+        config.workers = workers
+        return config
+
+    def data_path(self, relative_path):
+        return os.path.join(self.data_dir, relative_path)
+
+    def output_path(self, stem):
+        return os.path.join(self.output_dir, stem)
+
+    # Partition cache of one source (None when caching is off), keyed by the run
+    # parameters plus any source-specific `params`
+    def partition_cache(self, name, **params):
+        if self.cache_dir is None:
+            return None
+        return PartitionCache(self.cache_dir, name, params={
+            'anchor': self.anchor,
+            'bands': self.bands,
+            'window': (self.start, self.end),
+            **params
+        })
+
+
+# Registered sources, by name
+SOURCES = {}
+
+
+# Class decorator adding a source to the registry under its `name`
+def register_source(source_class):
+    SOURCES[source_class.name] = source_class()
+    return source_class
+
+
+# A dataset of the pipeline. `read` loads and filters the raw input and `aggregate`
+# turns it into the output frames, keyed by output file stem. Derived sources read
+# the outputs of the others and run after them.
+class Source:
+    name = None
+    derived = False
+    # Output file stem of the per-anchor counts of a batch run, None for sources
+    # without locations
+    anchor_stem = None
+
+    def read(self, config):
+        raise NotImplementedError
+
+    def aggregate(self, data, config):
+        raise NotImplementedError
+
+    # Read, aggregate and write the outputs, returning the written file paths. Each
+    # step is recorded as a stage under the source name. Outputs are frames, or count
+    # cubes saved in their own format.
+    def run(self, config):
+        with stage(self.name):
+            with stage('read') as record:
+                data = self.read(config)
+                record['rows_out'] = len(data) if isinstance(data, pd.DataFrame) else None
+            with stage('aggregate', rows_in=record['rows_out']) as record:
+                outputs = self.aggregate(data, config)
+                record['rows_out'] = sum(len(frame) for frame in outputs.values())
+            with stage('write', rows_in=record['rows_out']):
+                return [write_output(output, config.output_path(stem), config.output_format) for stem, output in outputs.items()]
+
+    # Long table of counts per anchor, band and time bin over config.anchors
+    def anchor_counts(self, config):
+        raise NotImplementedError
+
+    # Count around every anchor of a batch run and write the table, returning the
+    # written file paths
+    def run_anchors(self, config):
+        with stage(self.name):
+            with stage('anchor counts') as record:
+                counts_df = self.anchor_counts(config)
+                record['rows_out'] = len(counts_df)
+            with stage('write', rows_in=len(counts_df)):
+                return [write_frame(counts_df, config.output_path(self.anchor_stem), config.output_format)]
+
+
+# CSV export of located point events. The shared read stage streams only the
+# needed columns in blocks parsed by the worker pool, decodes the timestamp
+# (dropping the raw date and time strings), validates the rows (see
+# ppc.validate) and keeps the rows inside the radius bands, adding their
+# 'distance_band' label.
+class PointSource(Source):
+    # Input file relative to the data directory
+    path = None
+    # Raw column -> name, and raw column -> dtype
+    columns = {}
+    dtypes = {}
+    # Renamed date (and optional time-of-day) columns and the decoded timestamp column
+    date_column = None
+    time_column = None
+    date_format = '%m/%d/%Y'
+    timestamp_column = None
+    # Renamed columns identifying an incident, for dropping duplicate rows (None when
+    # the export has no row id)
+    id_columns = None
+    # Column holding the time bins of the per-anchor counts, suffixed with the bin
+    # width, and the name of their count column
+    bin_prefix = None
+    anchor_count_column = 'count'
+
+    # Source-specific row filter applied to every chunk before the shared stages
+    def filter_rows(self, chunk):
+        return chunk
+
+    # Columns summed by the per-anchor counts next to the row count: name -> values
+    # of the chunk
+    def anchor_weights(self, chunk):
+        return {}
+
+    # Timeline of the per-anchor counts and the name of its column
+    def anchor_timeline(self, config):
+        return timeline(config.start, config.end, config.freq), f'{self.bin_prefix}_{config.freq}'
+
+    # Filter, parse and validate stages shared by the reads
+    def clean_chunk(self, chunk, config):
+        with stage('filter', rows_in=len(chunk)) as record:
+            chunk = self.filter_rows(chunk).copy()
+            record['rows_out'] = len(chunk)
+        with stage('parse', rows_in=len(chunk)) as record:
+            times = chunk[self.time_column] if self.time_column else None
+            chunk[self.timestamp_column] = decode_timestamps(chunk[self.date_column], times, self.date_format)
+            # The raw date and time strings are not needed once decoded
+            chunk = chunk.drop(columns=[column for column in (self.date_column, self.time_column)
+                                        if column and column != self.timestamp_column])
+            record['rows_out'] = len(chunk)
+        return validate_chunk(chunk, self.timestamp_column, config.start, config.end, self.id_columns)
+
+    # Valid rows of one chunk inside the radius bands, with their 'distance_band' label,
+    # and the id hashes of all the valid rows
+    def keep_rows(self, chunk, config):
+        chunk = self.clean_chunk(chunk, config)
+        hashes = chunk_hashes(chunk)
+        with stage('geo filter', rows_in=len(chunk)) as record:
+            chunk['distance_band'] = assign_bands(chunk['latitude'], chunk['longitude'], config.anchor, config.bands)
+            chunk = chunk[chunk['distance_band'].notna()]
+            record['rows_out'] = len(chunk)
+        return chunk, hashes
+
+    def read(self, config):
+        cache = config.partition_cache(self.name)
+        # Duplicates read in different chunks only meet once the chunks are merged
+        kept_chunks = read_csv_chunked(config.data_path(self.path), self.columns, self.dtypes,
+                                       partial(self.keep_rows, config=config), cache=cache, workers=config.workers,
+                                       combine=drop_repeated_rows)
+        if cache is not None:
+            cache.prune()
+        if not kept_chunks:
+            return pd.DataFrame(columns=list(self.columns.values()))
+        return concat_chunks(kept_chunks)
+
+    # Valid rows counted around all anchors
+    def count_anchor_rows(self, rows, config):
+        time_range, _ = self.anchor_timeline(config)
+        with stage('count', rows_in=len(rows)) as record:
+            counts_df = anchor_counts(rows['latitude'], rows['longitude'], rows[self.timestamp_column], time_range,
+                                      list(config.anchors.values()), config.bands, weights=self.anchor_weights(rows),
+                                      name=self.anchor_count_column)
+            record['rows_out'] = len(counts_df)
+        return counts_df
+
+    # Valid rows counted per cell of `grid` and time bin (see ppc.grid), with the
+    # columns and timeline of the per-anchor counts
+    def count_cell_rows(self, rows, config, grid):
+        time_range, _ = self.anchor_timeline(config)
+        with stage('count', rows_in=len(rows)) as record:
+            cells = grid.cell_ids(rows['latitude'], rows['longitude'])
+            timestamps = rows[self.timestamp_column]
+            index_df = cell_counts(cells, timestamps, time_range, name=self.anchor_count_column)
+            for column, values in self.anchor_weights(rows).items():
+                index_df[column] = cell_counts(cells, timestamps, time_range, values, name=column)[column].to_numpy()
+            record['rows_out'] = len(index_df)
+        return index_df
+
+    # Valid rows of one chunk counted with `count`, with the id hashes of the counted rows
+    def count_chunk(self, chunk, config, count):
+        chunk = self.clean_chunk(chunk, config)
+        return count(chunk, config), chunk_hashes(chunk)
+
+    # Valid rows of one chunk whose id hash is one of `hashes`
+    def repeated_rows(self, chunk, config, hashes):
+        chunk = self.clean_chunk(chunk, config)
+        return chunk[np.isin(chunk['row_hash'].to_numpy(), hashes)]
+
+    # Count the valid rows with `count(rows, config)` chunk by chunk as they are read,
+    # so only the small per-chunk count tables and the id hashes are kept, and merge
+    # the tables with `merge`. An id counted in several chunks must only count in the
+    # first one, as the rows of a normal run do: the rows repeating it are then read
+    # back, with the same chunks, and their counts taken off with `subtract`. The
+    # counts are cached per chunk under `cache_name`, keyed by `params` too.
+    def count_chunks(self, config, count, merge, subtract, cache_name, **params):
+        cache = config.partition_cache(cache_name, **params)
+        blocks = cache is not None or config.workers > 1
+        chunks = read_csv_chunked(config.data_path(self.path), self.columns, self.dtypes,
+                                  partial(self.count_chunk, config=config, count=count),
+                                  cache=cache, workers=config.workers, blocks=blocks, combine=list)
+        if cache is not None:
+            cache.prune()
+        counts_df = merge([counts_df for counts_df, _ in chunks])
+
+        repeated = repeated_hashes([hashes for _, hashes in chunks])
+        if len(repeated):
+            with stage('duplicate id across chunks') as record:
+                rows = read_csv_chunked(config.data_path(self.path), self.columns, self.dtypes,
+                                        partial(self.repeated_rows, config=config, hashes=repeated),
+                                        workers=config.workers, blocks=blocks)
+                record['rows_in'] = len(rows)
+                # Every row but the first of each id was counted once too many
+                rows = rows[duplicate_hashes(rows['row_hash'])]
+                record['rows_out'] = record['rows_in'] - len(rows)
+            counts_df = subtract(counts_df, count(rows, config))
+        return counts_df
+
+    # Every chunk is counted around all anchors as it is read (see ppc.anchors)
+    def anchor_counts(self, config):
+        time_range, bin_column = self.anchor_timeline(config)
+        counts_df = self.count_chunks(config, self.count_anchor_rows, merge_anchor_counts, subtract_anchor_counts,
+                                      f'{self.name}-anchors', anchors=config.anchors, freq=time_range.freqstr)
+        return label_anchor_counts(counts_df, config.anchors, config.bands, bin_column)
+
+    # Long (cell, time_bin) table of the counts of the valid rows in each cell of `grid`
+    def cell_index(self, config, grid):
+        time_range, _ = self.anchor_timeline(config)
+        return self.count_chunks(config, partial(self.count_cell_rows, grid=grid), merge_cell_counts, subtract_cell_counts,
+                                 f'{self.name}-cells', grid=grid.params, freq=time_range.freqstr)
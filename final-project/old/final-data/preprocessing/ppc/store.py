@@ -0,0 +1,115 @@
+import os
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+from ppc.dtypes import output_counts
+
+# Extension of the timeline store files
+TIMELINE_EXTENSION = '.timeline'
+
+# File layout: MAGIC, the byte length of the JSON header as a little-endian uint64,
+# the header, then one contiguous array per column, each starting at a multiple of
+# ALIGNMENT bytes. The header holds the timeline start and step in nanoseconds, the
+# number of bins, and the name, dtype and byte offset of every column.
+MAGIC = b'PPCTL001'
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Write `columns` (name -> array with one value per bin of the regular `time_range`)
+# to `path` + TIMELINE_EXTENSION and return the file path. Compact counts are stored
+# as ppc.dtypes.OUTPUT_COUNT_DTYPE, so every store of a run has the same schema. The
+# file is written under a temporary name and renamed into place, so readers never
+# see a partial store.
+def write_timeline(path, time_range, columns):
+    output_file = path + TIMELINE_EXTENSION
+    arrays = {name: np.ascontiguousarray(output_counts(values)) for name, values in columns.items()}
+    for name, values in arrays.items():
+        if values.shape != (len(time_range),):
+            raise ValueError(f"Column {name!r} has shape {values.shape}, expected ({len(time_range)},)")
+
+    header = {
+        'start': int(time_range[0].value),
+        'step': int(pd.Timedelta(time_range.freq).value),
+        'n_bins': len(time_range),
+        'columns': [],
+    }
+    # Offsets depend on the header size, so lay the columns out until it is stable
+    data_start = 0
+    while True:
+        offset, layout = data_start, []
+        for name, values in arrays.items():
+            offset = _align(offset)
+            layout.append({'name': name, 'dtype': values.dtype.newbyteorder('<').str, 'offset': offset})
+            offset += values.nbytes
+        header['columns'] = layout
+        header_bytes = json.dumps(header).encode()
+        needed = _align(len(MAGIC) + 8 + len(header_bytes))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    temporary_file = f'{output_file}.{os.getpid()}.tmp'
+    with open(temporary_file, 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+        for column, values in zip(layout, arrays.values()):
+            file.write(b'\0' * (column['offset'] - file.tell()))
+            file.write(values.astype(column['dtype'], copy=False).tobytes())
+    os.replace(temporary_file, output_file)
+    return output_file
+
+
+# Read-only view of a timeline store. The file is memory-mapped once and every column
+# is a zero-copy array over it, so any number of processes can open the same store
+# and share its pages without parsing or copying it.
+class TimelineStore:
+    def __init__(self, path):
+        self.path = path if path.endswith(TIMELINE_EXTENSION) else path + TIMELINE_EXTENSION
+        with open(self.path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a timeline store")
+            header_length, = struct.unpack('<Q', file.read(8))
+            header = json.loads(file.read(header_length))
+
+        self.start = pd.Timestamp(header['start'])
+        self.step = pd.Timedelta(header['step'])
+        self.n_bins = header['n_bins']
+        self._buffer = np.memmap(self.path, dtype=np.uint8, mode='r')
+        self.columns = {}
+        for column in header['columns']:
+            dtype = np.dtype(column['dtype'])
+            data = self._buffer[column['offset']:column['offset'] + self.n_bins * dtype.itemsize]
+            self.columns[column['name']] = data.view(dtype)
+
+    def __len__(self):
+        return self.n_bins
+
+    @property
+    def time_range(self):
+        return pd.date_range(self.start, periods=self.n_bins, freq=self.step)
+
+    # Positions [first, stop) of the bins overlapping [start, end); None leaves that
+    # side open
+    def bin_slice(self, start=None, end=None):
+        first = 0 if start is None else (pd.Timestamp(start) - self.start) // self.step
+        stop = self.n_bins if end is None else -((self.start - pd.Timestamp(end)) // self.step)
+        return slice(min(max(first, 0), self.n_bins), min(max(stop, 0), self.n_bins))
+
+    # Zero-copy views of the `names` columns (default: all) over [start, end)
+    def window(self, start=None, end=None, names=None):
+        bins = self.bin_slice(start, end)
+        return {name: self.columns[name][bins] for name in names or self.columns}
+
+    # The same window copied into a frame, with the bin start times
+    def to_frame(self, start=None, end=None, names=None, time_column='time_interval'):
+        bins = self.bin_slice(start, end)
+        frame = pd.DataFrame({time_column: self.time_range[bins]})
+        for name, values in self.window(start, end, names).items():
+            frame[name] = np.array(values)
+        return frame
@@ -0,0 +1,277 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ppc.geo import EMPIRE_STATE
+from ppc.grid import NYC_BBOX
+from ppc.ingest import WINDOW_START, WINDOW_END
+from ppc.runner import SOURCES
+
+# Rows written per chunk, so inputs of hundreds of millions of rows never sit in memory
+GENERATE_CHUNK_SIZE = 1_000_000
+
+# Rows of each input for a scale of `rows`: the taxi trips get all of them, the
+# NYPD and collision exports a share matching their size relative to the trips
+SCALE = {
+    'taxis': 1.0,
+    'arrests': 0.2,
+    'crashes': 0.1,
+    'shootings': 0.002,
+    'events': 0.001,
+}
+
+# Random stream of every generated input, so the inputs draw different numbers from
+# the same seed
+SEED_STREAMS = {
+    'arrests': 0,
+    'shootings': 1,
+    'crashes': 2,
+    'events': 3,
+    'weather': 4,
+    'zones': 5,
+    'taxis': 6,
+}
+
+# Version of the generated inputs, bumped whenever the same seed gives other data
+GENERATOR_VERSION = 2
+
+# Number of taxi zones, and the share of points clustered around the anchor
+N_ZONES = 263
+CLUSTERED_SHARE = 0.4
+
+
+# Random day offsets and minutes of the day over [start - margin, end + margin), so the
+# window filter has rows to drop on both sides; the hours follow a day/night cycle
+def _random_times(rng, n, start, end, margin=pd.Timedelta(days=30)):
+    first_day = (start - margin).normalize()
+    n_days = (end + margin - first_day).days
+    days = rng.integers(0, n_days, n)
+    hour_weights = 1.5 + np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)
+    hours = rng.choice(24, n, p=hour_weights / hour_weights.sum())
+    minutes = hours * 60 + rng.integers(0, 60, n)
+    return first_day, days, minutes
+
+
+# Coordinates with a share clustered around the anchor and the rest spread over the city
+def _random_points(rng, n, anchor=EMPIRE_STATE, bbox=NYC_BBOX, missing=0.0):
+    lat_min, lat_max, lon_min, lon_max = bbox
+    lat = rng.uniform(lat_min, lat_max, n)
+    lon = rng.uniform(lon_min, lon_max, n)
+    clustered = rng.random(n) < CLUSTERED_SHARE
+    lat[clustered] = anchor[0] + rng.normal(0, 0.015, clustered.sum())
+    lon[clustered] = anchor[1] + rng.normal(0, 0.02, clustered.sum())
+    if missing:
+        no_location = rng.random(n) < missing
+        lat[no_location] = np.nan
+        lon[no_location] = np.nan
+    return lat, lon
+
+
+# Formatted dates of consecutive days and formatted minutes of the day, gathered by
+# index instead of formatting every row
+def _day_strings(first_day, n_days, date_format='%m/%d/%Y'):
+    return pd.date_range(first_day, periods=n_days, freq='1D').strftime(date_format).to_numpy()
+
+
+def _minute_strings(time_format):
+    minutes = np.arange(24 * 60)
+    return np.array([time_format.format(hour=m // 60, minute=m % 60) for m in minutes])
+
+
+# Write `rows` rows produced by `make_chunk(rng, n, offset)` to a CSV file, chunk by chunk
+def _write_csv(path, rows, make_chunk, seed, chunk_rows=GENERATE_CHUNK_SIZE):
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='') as file:
+        for offset in range(0, rows, chunk_rows):
+            chunk = make_chunk(rng, min(chunk_rows, rows - offset), offset)
+            chunk.to_csv(file, index=False, header=offset == 0)
+    return path
+
+
+def generate_arrests(path, rows, start=WINDOW_START, end=WINDOW_END, seed=0):
+    def make_chunk(rng, n, offset):
+        first_day, days, _ = _random_times(rng, n, start, end)
+        lat, lon = _random_points(rng, n)
+        return pd.DataFrame({
+            'ARREST_KEY': np.arange(offset, offset + n),
+            'ARREST_DATE': _day_strings(first_day, days.max() + 1)[days],
+            'OFNS_DESC': rng.choice(['ASSAULT 3', 'PETIT LARCENY', 'DANGEROUS DRUGS', 'FELONY ASSAULT'], n),
+            'LAW_CAT_CD': rng.choice(['F', 'M', 'V', 'I'], n, p=[0.3, 0.55, 0.1, 0.05]),
+            'ARREST_BORO': rng.choice(['M', 'B', 'Q', 'K', 'S'], n),
+            'Latitude': lat.round(6),
+            'Longitude': lon.round(6),
+        })
+    return _write_csv(path, rows, make_chunk, seed)
+
+
+def generate_shootings(path, rows, start=WINDOW_START, end=WINDOW_END, seed=1):
+    minute_strings = _minute_strings('{hour:02d}:{minute:02d}:00')
+
+    def make_chunk(rng, n, offset):
+        first_day, days, minutes = _random_times(rng, n, start, end)
+        lat, lon = _random_points(rng, n)
+        return pd.DataFrame({
+            'INCIDENT_KEY': np.arange(offset, offset + n),
+            'OCCUR_DATE': _day_strings(first_day, days.max() + 1)[days],
+            'OCCUR_TIME': minute_strings[minutes],
+            'BORO': rng.choice(['MANHATTAN', 'BROOKLYN', 'QUEENS', 'BRONX'], n),
+            'STATISTICAL_MURDER_FLAG': rng.choice(['true', 'false'], n, p=[0.2, 0.8]),
+            'Latitude': lat.round(6),
+            'Longitude': lon.round(6),
+        })
+    return _write_csv(path, rows, make_chunk, seed)
+
+
+def generate_crashes(path, rows, start=WINDOW_START, end=WINDOW_END, seed=2):
+    # The export writes times without a leading zero on the hour
+    minute_strings = _minute_strings('{hour}:{minute:02d}')
+
+    def make_chunk(rng, n, offset):
+        first_day, days, minutes = _random_times(rng, n, start, end)
+        lat, lon = _random_points(rng, n, missing=0.05)
+        chunk = pd.DataFrame({
+            'CRASH DATE': _day_strings(first_day, days.max() + 1)[days],
+            'CRASH TIME': minute_strings[minutes],
+            'BOROUGH': rng.choice(['MANHATTAN', 'BROOKLYN', 'QUEENS', 'BRONX', ''], n),
+            'LATITUDE': lat.round(6),
+            'LONGITUDE': lon.round(6),
+        })
+        for person in ['PERSONS', 'PEDESTRIANS', 'CYCLIST', 'MOTORIST']:
+            chunk[f'NUMBER OF {person} INJURED'] = rng.poisson(0.3, n)
+            chunk[f'NUMBER OF {person} KILLED'] = rng.poisson(0.002, n)
+        chunk['COLLISION_ID'] = np.arange(offset, offset + n)
+        return chunk
+    return _write_csv(path, rows, make_chunk, seed)
+
+
+def generate_events(path, rows, start=WINDOW_START, end=WINDOW_END, seed=3):
+    def make_chunk(rng, n, offset):
+        first_day, days, minutes = _random_times(rng, n, start, end)
+        starts = first_day + pd.to_timedelta(days * 24 * 60 + minutes, unit='min')
+        ends = starts + pd.to_timedelta(np.ceil(rng.lognormal(4.5, 1.0, n)), unit='min')
+        return pd.DataFrame({
+            'Event ID': np.arange(offset, offset + n),
+            'Start Date/Time': starts.strftime('%m/%d/%Y %I:%M:%S %p'),
+            'End Date/Time': ends.strftime('%m/%d/%Y %I:%M:%S %p'),
+            'Event Type': rng.choice(['Special Event', 'Sport - Adult', 'Sport - Youth', 'Street Event', 'Parade'], n),
+            'Event Borough': rng.choice(['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island'], n),
+        })
+    return _write_csv(path, rows, make_chunk, seed)
+
+
+# Hourly weather readings stamped in UTC with the offset of New York
+def generate_weather(path, start=WINDOW_START, end=WINDOW_END, seed=4):
+    rng = np.random.default_rng(seed)
+    hours = pd.date_range(start - pd.Timedelta(days=1), end + pd.Timedelta(days=1), freq='1h', tz='UTC')
+    n = len(hours)
+    temp = 18 + 8 * np.sin(np.arange(n) / 24 * 2 * np.pi) + rng.normal(0, 2, n)
+    rain = np.where(rng.random(n) < 0.1, rng.exponential(1.0, n).round(2), np.nan)
+    weather_df = pd.DataFrame({
+        'dt': hours.asi8 // 10 ** 9,
+        'dt_iso': hours.strftime('%Y-%m-%d %H:%M:%S +0000 UTC'),
+        'timezone': -14400,
+        'city_name': 'Empire State Building',
+        'temp': temp.round(2),
+        'feels_like': (temp - rng.uniform(0, 3, n)).round(2),
+        'humidity': rng.integers(30, 100, n),
+        'wind_speed': rng.gamma(2.0, 2.0, n).round(2),
+        'rain_1h': rain,
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    weather_df.to_csv(path, index=False)
+    return path
+
+
+def generate_holidays(path, start=WINDOW_START, end=WINDOW_END):
+    years = range(start.year - 1, end.year + 2)
+    dates = pd.to_datetime([f'{year}-{month_day}' for year in years for month_day in ['01-01', '05-26', '07-04', '09-01', '11-27', '12-25']])
+    holidays_df = pd.DataFrame({
+        'Title': np.tile(["New Year's Day", 'Memorial Day', 'Independence Day', 'Labor Day', 'Thanksgiving Day', 'Christmas Day'], len(years)),
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Year': dates.year,
+        'Month': dates.month,
+        'Day': dates.day,
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    holidays_df.to_csv(path, index=False)
+    return path
+
+
+# Zone centroids, clustered like the taxi zones are (dense in Manhattan)
+def generate_zones(path, seed=5):
+    rng = np.random.default_rng(seed)
+    lat, lon = _random_points(rng, N_ZONES)
+    zones_df = pd.DataFrame({'LocationID': np.arange(1, N_ZONES + 1), 'latitude': lat, 'longitude': lon})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    zones_df.to_csv(path, index=False)
+    return path
+
+
+# One parquet file of yellow taxi trips per month of the window. Pickup zones are
+# skewed like the real ones (a few zones take most pickups) and a few ids have no
+# centroid; each file holds some trips of the neighbouring months.
+def generate_taxis(data_dir, rows, start=WINDOW_START, end=WINDOW_END, seed=6,
+                   chunk_rows=GENERATE_CHUNK_SIZE):
+    rng = np.random.default_rng(seed)
+    zone_weights = 1 / np.arange(1, N_ZONES + 3) ** 0.8
+    zone_ids = rng.permutation(N_ZONES + 2) + 1
+    zone_p = zone_weights / zone_weights.sum()
+
+    months = pd.period_range(start, end - pd.Timedelta(1), freq='M')
+    os.makedirs(os.path.join(data_dir, 'data'), exist_ok=True)
+    paths = []
+    for i, month in enumerate(months):
+        month_rows = rows // len(months) + (i < rows % len(months))
+        month_start = month.start_time.value
+        month_end = (month + 1).start_time.value
+        path = os.path.join(data_dir, f'data/yellow_tripdata_{month}.parquet')
+        writer = None
+        for offset in range(0, month_rows, chunk_rows):
+            n = min(chunk_rows, month_rows - offset)
+            pickup = rng.integers(month_start - 2 * 3600 * 10 ** 9, month_end, n).astype('datetime64[ns]')
+            duration = (rng.gamma(2.0, 420.0, n) * 10 ** 9).astype('timedelta64[ns]')
+            table = pa.table({
+                'VendorID': rng.integers(1, 3, n).astype(np.int64),
+                'tpep_pickup_datetime': pickup,
+                'tpep_dropoff_datetime': pickup + duration,
+                'passenger_count': rng.integers(1, 7, n).astype(np.float64),
+                'trip_distance': rng.gamma(1.5, 2.0, n).round(2),
+                'PULocationID': rng.choice(zone_ids, n, p=zone_p).astype(np.int64),
+                'DOLocationID': rng.choice(zone_ids, n, p=zone_p).astype(np.int64),
+                'fare_amount': rng.gamma(2.0, 7.0, n).round(2),
+                'total_amount': rng.gamma(2.0, 9.0, n).round(2),
+            })
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+            paths.append(path)
+    return paths
+
+
+# Write a full synthetic input tree under `data_dir`, laid out like the real one
+# (see RunConfig.data_path), with the inputs of `sources` scaled to `rows`
+def generate_inputs(data_dir, rows, start=WINDOW_START, end=WINDOW_END, seed=0, sources=None):
+    sources = sources or list(SCALE) + ['holidays']
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    scaled = {name: max(1, int(rows * share)) for name, share in SCALE.items()}
+    generators = {
+        'arrests': generate_arrests,
+        'shootings': generate_shootings,
+        'crashes': generate_crashes,
+        'events': generate_events,
+    }
+    for name, generate in generators.items():
+        if name in sources:
+            generate(os.path.join(data_dir, SOURCES[name].path), scaled[name], start, end, seed=[seed, SEED_STREAMS[name]])
+    if 'holidays' in sources:
+        generate_holidays(os.path.join(data_dir, SOURCES['holidays'].path), start, end)
+    if 'taxis' in sources:
+        generate_zones(os.path.join(data_dir, SOURCES['taxis'].zone_centroids_path), seed=[seed, SEED_STREAMS['zones']])
+        generate_taxis(data_dir, scaled['taxis'], start, end, seed=[seed, SEED_STREAMS['taxis']])
+    generate_weather(os.path.join(data_dir, SOURCES['features'].weather_path), start, end, seed=[seed, SEED_STREAMS['weather']])
+    return scaled
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from ppc.features import bin_index
+
+
+NAT = np.iinfo(np.int64).min
+NS_PER_SECOND = 1_000_000_000
+
+
+# Parse fixed-format date strings to int64 nanoseconds since the epoch (NAT when
+# missing or malformed). Exports repeat the same few hundred dates over millions of
+# rows, so only the distinct strings are parsed and the result is gathered back.
+def parse_dates(dates, date_format='%m/%d/%Y'):
+    codes, uniques = pd.factorize(np.asarray(dates, dtype=object))
+    parsed = pd.to_datetime(uniques, format=date_format, errors='coerce').values.view(np.int64)
+    return np.where(codes >= 0, parsed[codes], NAT)
+
+
+# Time of day as H:MM or HH:MM:SS, with one or two digits per field
+TIME_PATTERN = r'^\s*(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?\s*$'
+
+
+# Parse "H:MM" / "HH:MM:SS" time strings to int64 nanoseconds since midnight
+# (NAT when missing or malformed, e.g. "10:ab", "10" or "25:99"), again parsing each
+# distinct string once
+def parse_times(times):
+    codes, uniques = pd.factorize(np.asarray(times, dtype=object))
+    fields = pd.Series(uniques, dtype=object).astype(str).str.extract(TIME_PATTERN).astype(np.float64).to_numpy()
+    hours, minutes, seconds = fields[:, 0], fields[:, 1], np.nan_to_num(fields[:, 2])
+    valid = (hours < 24) & (minutes < 60) & (seconds < 60)
+    parsed = np.where(valid, (np.nan_to_num(hours) * 3600 + np.nan_to_num(minutes) * 60 + seconds).astype(np.int64) * NS_PER_SECOND, NAT)
+    return np.where(codes >= 0, parsed[codes], NAT)
+
+
+# Decode a date column and an optional time-of-day column into datetime64[ns] values
+def decode_timestamps(dates, times=None, date_format='%m/%d/%Y'):
+    timestamps = parse_dates(dates, date_format)
+    if times is not None:
+        time_of_day = parse_times(times)
+        missing = (timestamps == NAT) | (time_of_day == NAT)
+        timestamps = np.where(missing, NAT, timestamps + time_of_day)
+    return timestamps.view('datetime64[ns]')
+
+
+# Decode straight to the bin index on a regular timeline (-1 outside it)
+def decode_bins(dates, times, time_range, date_format='%m/%d/%Y'):
+    return bin_index(decode_timestamps(dates, times, date_format), time_range)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from ppc.ingest import window_mask
+from ppc.instrument import stage
+
+# Extent of the five boroughs (lat_min, lat_max, lon_min, lon_max) with a small
+# margin. Unlike ppc.grid.NYC_BBOX it takes in the south tip of Staten Island.
+# Rows outside, like the (0, 0) placeholders of the NYPD exports, are rejected.
+CITY_BBOX = (40.47, 40.93, -74.28, -73.68)
+
+# Hash standing in for a row without an id; such rows are never duplicates
+NO_ID = 0
+
+
+# 64-bit hash of the `id_columns` of every row, NO_ID for rows missing one of them
+def row_hashes(chunk, id_columns):
+    hashes = pd.util.hash_pandas_object(chunk[id_columns], index=False).to_numpy()
+    return np.where(chunk[id_columns].notna().all(axis=1).to_numpy(), hashes, NO_ID)
+
+
+# Whether each row repeats the hash of an earlier row
+def duplicate_hashes(hashes):
+    hashes = np.asarray(hashes)
+    return pd.Series(hashes).duplicated().to_numpy() & (hashes != NO_ID)
+
+
+# Duplicates among the rows still kept (the others are rejected anyway)
+def duplicates_among(hashes, keep):
+    rows = np.flatnonzero(keep)
+    duplicates = np.zeros(len(hashes), dtype=bool)
+    duplicates[rows[duplicate_hashes(hashes[rows])]] = True
+    return duplicates
+
+
+# Drop the rows of a parsed chunk that break one of the rules, checked in order:
+#   missing coordinates   latitude or longitude is empty
+#   outside city          coordinates outside `bbox`
+#   missing date          the timestamp could not be decoded
+#   outside window        timestamp outside [start, end)
+#   duplicate id          the id hash repeats an earlier row of the chunk
+# Every rule is a vectorized mask over the rows the earlier rules kept and is
+# recorded as a stage, so the report shows its rejects as rows_in - rows_out. With
+# `id_columns` they are replaced by their 'row_hash', for finding the duplicates
+# across chunks once the chunks are merged.
+def validate_chunk(chunk, timestamp_column, start, end, id_columns=None, bbox=CITY_BBOX):
+    lat_min, lat_max, lon_min, lon_max = bbox
+    lat, lon = chunk['latitude'].to_numpy(dtype=np.float64), chunk['longitude'].to_numpy(dtype=np.float64)
+    timestamps = chunk[timestamp_column]
+
+    rules = [
+        ('missing coordinates', lambda: ~np.isnan(lat) & ~np.isnan(lon)),
+        ('outside city', lambda: (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)),
+        ('missing date', lambda: timestamps.notna().to_numpy()),
+        ('outside window', lambda: window_mask(timestamps, start, end).to_numpy()),
+    ]
+    hashes = None
+    if id_columns:
+        hashes = row_hashes(chunk, id_columns)
+        rules.append(('duplicate id', lambda: ~duplicates_among(hashes, keep)))
+
+    with stage('validate', rows_in=len(chunk)) as record:
+        keep = np.ones(len(chunk), dtype=bool)
+        for rule, rule_mask in rules:
+            with stage(rule, rows_in=int(keep.sum())) as rule_record:
+                keep &= rule_mask()
+                rule_record['rows_out'] = int(keep.sum())
+        chunk = chunk[keep].copy()
+        if hashes is not None:
+            chunk = chunk.drop(columns=id_columns)
+            chunk['row_hash'] = hashes[keep]
+        record['rows_out'] = len(chunk)
+    return chunk
+
+
+# The 'row_hash' of every row of a validated chunk, none without id columns
+def chunk_hashes(chunk):
+    return chunk['row_hash'].to_numpy() if 'row_hash' in chunk else np.empty(0, dtype=np.uint64)
+
+
+# Hashes found in more than one of the arrays `hash_sets`, each without repeats (e.g.
+# the chunk_hashes of validated chunks)
+def repeated_hashes(hash_sets):
+    hashes, counts = np.unique(np.concatenate([np.empty(0, dtype=np.uint64), *hash_sets]), return_counts=True)
+    return hashes[(counts > 1) & (hashes != NO_ID)]
+
+
+# Drop the duplicates that were read in different chunks from (chunk, hashes) pairs,
+# `hashes` being the chunk_hashes of the chunk before any later filter (e.g. the
+# radius bands). A row is dropped when its id was valid in an earlier chunk, whether
+# or not that earlier row was kept, as it is within a chunk, so the rows kept do not
+# depend on the chunk size. Returns the chunks without their hash column.
+def drop_repeated_rows(chunks):
+    if not any('row_hash' in chunk for chunk, _ in chunks):
+        return [chunk for chunk, _ in chunks]
+    # Within a chunk the ids are unique, so a repeat of the concatenated hashes is an
+    # id valid in an earlier chunk
+    repeated = duplicate_hashes(np.concatenate([np.empty(0, dtype=np.uint64), *[hashes for _, hashes in chunks]]))
+    kept_chunks = []
+    with stage('duplicate id across chunks', rows_in=sum(len(chunk) for chunk, _ in chunks)) as record:
+        offset = 0
+        for chunk, hashes in chunks:
+            seen = hashes[repeated[offset:offset + len(hashes)]]
+            offset += len(hashes)
+            kept_chunks.append(chunk[~np.isin(chunk['row_hash'].to_numpy(), seen)].drop(columns='row_hash'))
+        record['rows_out'] = sum(len(chunk) for chunk in kept_chunks)
+    return kept_chunks
+
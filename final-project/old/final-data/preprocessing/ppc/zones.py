@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from ppc.geo import EMPIRE_STATE, DEFAULT_BANDS, haversine_vectorized, band_codes
+
+
+# One slot per taxi zone LocationID
+ZONE_DTYPE = np.dtype([
+    ('latitude', np.float32),
+    ('longitude', np.float32),
+    ('distance', np.float32),
+    ('band', np.int8),
+])
+
+
+# Zone table indexed by LocationID holding the centroid, the distance to the anchor
+# and the band code (into list(bands)). IDs without a centroid keep NaN
+# coordinates and band -1.
+def zone_table(zone_centroids_df, anchor=EMPIRE_STATE, bands=DEFAULT_BANDS):
+    location_ids = zone_centroids_df['LocationID'].to_numpy(dtype=np.int64)
+    lat = zone_centroids_df['latitude'].to_numpy(dtype=np.float64)
+    lon = zone_centroids_df['longitude'].to_numpy(dtype=np.float64)
+
+    table = np.empty(location_ids.max() + 1, dtype=ZONE_DTYPE)
+    table['latitude'] = np.nan
+    table['longitude'] = np.nan
+    table['distance'] = np.nan
+    table['band'] = -1
+
+    table['latitude'][location_ids] = lat
+    table['longitude'][location_ids] = lon
+    table['distance'][location_ids] = haversine_vectorized(lat, lon, anchor)
+    table['band'][location_ids] = band_codes(lat, lon, (anchor,), bands)[:, 0]
+    return table
+
+
+# Fancy-index a zone table column with the LocationID of every trip.
+# Missing or out-of-range IDs get `missing`.
+def lookup(table_column, location_ids, missing):
+    location_ids = np.asarray(pd.Series(location_ids).fillna(-1), dtype=np.int64)
+    known = (location_ids >= 0) & (location_ids < len(table_column))
+    values = table_column[np.where(known, location_ids, 0)]
+    values[~known] = missing
+    return values
+
+
+# Band label per trip from its LocationID, as a categorical (NaN for trips in no band)
+def zone_bands(table, location_ids, bands=DEFAULT_BANDS):
+    codes = lookup(table['band'], location_ids, -1)
+    return pd.Categorical.from_codes(codes, categories=list(bands))
+
+
+# Whether each LocationID has a centroid in the zone table
+def known_zones(table, location_ids):
+    return ~np.isnan(lookup(table['latitude'], location_ids, np.nan))
+
+
+# LocationIDs whose centroid falls in one of the bands, for pushing down as a filter
+def band_zone_ids(table):
+    return [int(location_id) for location_id in np.flatnonzero(table['band'] >= 0)]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the ppc package importable whatever directory pytest is run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+from ppc.synthetic import generate_inputs
+
+PREPROCESSING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Run the pipeline in a new process and return the stage paths of its report
+def run_pipeline(data_dir, output_dir, report_file, *args, code_dir=PREPROCESSING_DIR):
+    subprocess.run([sys.executable, '-m', 'ppc', '--data-dir', data_dir, '--output-dir', output_dir,
+                    '--report', report_file, *args], cwd=code_dir, check=True, capture_output=True)
+    with open(report_file) as file:
+        return [record['stage'] for record in json.load(file)['stages']]
+
+
+# A second run in a new process must take every CSV block and taxi month from the
+# partition cache, and leave one cache entry per partition
+def test_rerun_parses_nothing(tmp_path):
+    data_dir, output_dir = str(tmp_path / 'data'), str(tmp_path / 'out')
+    generate_inputs(data_dir, 20_000, sources=['arrests', 'crashes', 'taxis', 'holidays'])
+    args = ['--sources', 'crashes', 'taxis', 'arrests', '--workers', '2']
+
+    first = run_pipeline(data_dir, output_dir, str(tmp_path / 'first.json'), *args)
+    assert any(stage.endswith('/read_csv') for stage in first)
+    assert any(stage.endswith('/month') for stage in first)
+    cache_entries = sorted(os.listdir(os.path.join(output_dir, 'ppc-cache', 'crashes')))
+
+    second = run_pipeline(data_dir, output_dir, str(tmp_path / 'second.json'), *args)
+    assert not [stage for stage in second if stage.endswith('/read_csv') or stage.endswith('/month')]
+    assert sorted(os.listdir(os.path.join(output_dir, 'ppc-cache', 'crashes'))) == cache_entries
+
+
+# Editing any module of the package must invalidate the cached partitions, even one
+# that no cache key names, like the time-of-day parser
+def test_code_change_invalidates_cache(tmp_path):
+    data_dir, output_dir, code_dir = str(tmp_path / 'data'), str(tmp_path / 'out'), str(tmp_path / 'code')
+    shutil.copytree(os.path.join(PREPROCESSING_DIR, 'ppc'), os.path.join(code_dir, 'ppc'),
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    generate_inputs(data_dir, 20_000, sources=['shootings'])
+    args = ['--sources', 'shootings', '--workers', '2']
+
+    run_pipeline(data_dir, output_dir, str(tmp_path / 'first.json'), *args, code_dir=code_dir)
+    with open(os.path.join(code_dir, 'ppc', 'timestamps.py'), 'a') as file:
+        file.write('\n# edited\n')
+    second = run_pipeline(data_dir, output_dir, str(tmp_path / 'second.json'), *args, code_dir=code_dir)
+    assert any(stage.endswith('/read_csv') for stage in second)
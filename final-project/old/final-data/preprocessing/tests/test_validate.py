@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from ppc.validate import chunk_hashes, drop_repeated_rows
+
+
+# Validated chunk of (id hash, band) rows and the hashes of all its valid rows, as
+# PointSource.keep_rows returns them after the rows outside the bands are dropped
+def banded_chunk(valid_hashes, banded_hashes):
+    chunk = pd.DataFrame({'row_hash': np.array(banded_hashes, dtype=np.uint64), 'distance_band': '1000m'})
+    return chunk, np.array(valid_hashes, dtype=np.uint64)
+
+
+# An id first valid outside the bands and repeated inside them in a later chunk is
+# dropped, as it is when both rows are read in the same chunk
+def test_repeat_of_a_row_outside_the_bands_is_dropped():
+    chunks = drop_repeated_rows([banded_chunk([7], []), banded_chunk([7, 8], [7, 8])])
+    assert [len(chunk) for chunk in chunks] == [0, 1]
+    assert 'row_hash' not in chunks[1]
+
+
+def test_chunks_without_ids_are_kept():
+    chunk = pd.DataFrame({'distance_band': ['1000m', '1000m']})
+    assert drop_repeated_rows([(chunk, chunk_hashes(chunk))])[0] is chunk